@@ -1,26 +1,38 @@
 import tkinter as tk
 from lib.dateandtime import DateAndTime
-import json
 from tkinter import ttk, messagebox
-import os
-import sys
 from datetime import datetime, timedelta
 
 
+from lib.aggregate import ShiftTable
 from lib.utils import (
     load_users,
     load_task_config,
+    get_task_index,
     load_employee_logs,
     now_trimmed,
-    format_duration,
+    now_minutes,
+    format_duration_minutes,
     save_employee_logs,
-    resource_path,
     save_users,
-    save_task_config
+    save_task_config,
+    list_companies,
+    query_shifts,
+    iso_to_minutes,
+    get_shift_interval_index,
+    replace_employee_shifts,
+    load_open_shifts,
+    load_requests,
+    update_request,
+    delete_request,
+    read_changes,
+    change_key,
+    change_to_shift,
+    shift_key,
+    date_to_minutes
 )
 
-COMPANY_FOLDER = resource_path("Database/Fyrirtaeki")
-REQUESTS_FOLDER = resource_path("Database/Requests")
+CHANGE_POLL_MS = 2000  # how often the open page picks up changes from the terminals
 
 class AdminApp(tk.Tk):
     def __init__(self):
@@ -36,9 +48,17 @@ class AdminApp(tk.Tk):
         self.location_var = tk.StringVar(value="Any")
         self.company_var = tk.StringVar(value="Any")
         self.task_var = tk.StringVar(value="Any")
+        self.request_status_var = tk.StringVar(value="All")
+
+        self.current_page = None
+        self.feed_cursor = None
+        self.shift_model = {}   # shift_key -> Shift shown in the Shift Viewer
+        self.shift_cards = {}   # shift_key -> card frame
+        self.request_view = {}  # request id -> request shown on Handle Requests
 
         self.create_navigation()
         self.create_shift_viewer()
+        self.after(CHANGE_POLL_MS, self.poll_changes)
 
     def create_navigation(self):
         nav_frame = tk.Frame(self, bg="#d9e6f2")
@@ -51,22 +71,12 @@ class AdminApp(tk.Tk):
             btn.pack(side="left", padx=10, pady=5)
             self.nav_buttons[name] = btn
 
-    def save_status_change(self, filepath, employee, req_obj, new_status):
+    def save_status_change(self, employee, req_obj, new_status):
         try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                requests = json.load(f)
-
-            # Update the matching request
-            for r in requests:
-                if r == req_obj:
-                    r["status"] = new_status
-                    break
-
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(requests, f, indent=2)
+            update_request(req_obj["id"], {"status": new_status})
 
             tk.messagebox.showinfo("Saved", f"Status for {employee}'s request updated to '{new_status}'.")
-            self.show_request_page()
+            self.show_handle_requests()
 
         except Exception as e:
             tk.messagebox.showerror("Error", f"Could not save status:\n{e}")
@@ -91,6 +101,32 @@ class AdminApp(tk.Tk):
             placeholder = tk.Label(self.main_area, text=f"{name} page coming soon...", font=("Helvetica", 16))
             placeholder.pack(pady=20)
 
+    def poll_changes(self):
+        """Apply changes published since the current page was loaded."""
+        try:
+            changes, self.feed_cursor = read_changes(self.feed_cursor)
+        except Exception as e:
+            print(f"[WARN] Could not read the change feed: {e}")
+            changes = []
+        if changes is None:
+            # the feed started over, or the cursor's generation is unknown:
+            # changes may be missing, so reload pages that follow it
+            if self.current_page in ("Shift Viewer", "Control Board", "Handle Requests"):
+                self.switch_page(self.current_page)
+        elif changes:
+            shift_changes = [c for c in changes if "shift" in c]
+            request_changes = [c for c in changes if "request" in c]
+            if self.current_page == "Shift Viewer" and shift_changes:
+                self.apply_shift_changes(shift_changes)
+            elif self.current_page == "Control Board" and shift_changes:
+                self.show_control_board()
+            elif self.current_page == "Handle Requests" and any(
+                    c["type"] == "request_deleted" and c["request"]["id"] in self.request_view
+                    or c["type"] != "request_deleted" and self.request_view.get(c["request"]["id"]) != c["request"]
+                    for c in request_changes):
+                self.show_handle_requests()
+        self.after(CHANGE_POLL_MS, self.poll_changes)
+
     def clear_main_area(self):
         for widget in self.main_area.winfo_children():
             widget.destroy()
@@ -102,6 +138,7 @@ class AdminApp(tk.Tk):
 
     def show_shift_viewer(self):
         self.clear_main_area()
+        self.current_page = "Shift Viewer"
 
         filter_frame = tk.Frame(self.main_area, bg="#e9f0f8")
         filter_frame.pack(fill="x", pady=10)
@@ -127,6 +164,9 @@ class AdminApp(tk.Tk):
         self.task_dropdown.pack(side="left", padx=5)
         self.task_dropdown.bind("<<ComboboxSelected>>", self.refresh_shifts)
 
+        self.shift_summary = tk.Label(self.main_area, anchor="w", bg="#f4f4f4", font=("Helvetica", 11))
+        self.shift_summary.pack(fill="x", padx=15)
+
         self.shift_canvas = tk.Canvas(self.main_area, bg="#f4f4f4", highlightthickness=0)
         self.shift_scrollbar = tk.Scrollbar(self.main_area, orient="vertical", command=self.shift_canvas.yview)
         self.shift_canvas.configure(yscrollcommand=self.shift_scrollbar.set)
@@ -149,8 +189,7 @@ class AdminApp(tk.Tk):
         self.refresh_shifts()
 
     def get_company_names(self):
-        return [name for name in os.listdir(COMPANY_FOLDER)
-                if os.path.isdir(os.path.join(COMPANY_FOLDER, name))]
+        return list_companies()
 
     def refresh_shifts(self, event=None):
         for widget in self.shift_frame.winfo_children():
@@ -173,66 +212,91 @@ class AdminApp(tk.Tk):
         else:
             start_date = today
 
-        users = [u for u in self.users if (company == "Any" or u["company"] == company)]
+        self.shift_filter = (company, location, task_filter,
+                             date_to_minutes(start_date), date_to_minutes(today + timedelta(days=1)))
+        users_by_id = {u["id"]: u for u in self.users}
 
-        active, finished = [], []
         used_locations = set()
         used_tasks = set()
         used_companies = set()
 
-        for user in users:
-            logs = load_employee_logs(user)
-            for log in logs:
-                start_dt = datetime.fromisoformat(log["clock_in"]).date()
-                if not (start_date <= start_dt <= today):
-                    continue
-                used_locations.add(log.get("location"))
-                used_tasks.add(log.get("task"))
-                used_companies.add(user["company"])
-
-                if location != "Any" and log.get("location") != location:
-                    continue
-                if task_filter != "Any" and log.get("task") != task_filter:
-                    continue
-
-                end = log.get("clock_out")
-                duration = format_duration(log["clock_in"], now_trimmed(), ongoing=True) if end is None else format_duration(log["clock_in"], end)
-                shift_data = (user["name"], user["id"], log["task"], log["location"], log["clock_in"], end, duration)
-                (active if end is None else finished).append(shift_data)
+        # take the feed position first, so no change falls between it and the query
+        self.feed_cursor = read_changes()[1]
+        self.shift_model = {}
+        shifts = query_shifts(None if company == "Any" else company, since=start_date, until=today)
+        for shift in shifts:
+            user = users_by_id.get(shift.user_id)
+            if user is None:
+                continue
+            used_locations.add(shift.location)
+            used_tasks.add(shift.task)
+            used_companies.add(user["company"])
 
-        filtered_locations = set()
-        filtered_companies = set()
-        filtered_tasks = set()
+            if self.shift_matches(shift):
+                self.shift_model[shift_key(shift)] = shift
 
-        for loc, comps in self.task_config.items():
-            if location != "Any" and loc != location:
-                continue
-            for comp_name, tasks in comps.items():
-                if company != "Any" and comp_name != company:
-                    continue
-                filtered_locations.add(loc)
-                filtered_companies.add(comp_name)
-                for t in tasks:
-                    # handle dicts or legacy strings
-                    name = t["name"] if isinstance(t, dict) else t
-                    filtered_tasks.add(name)
+        task_index = get_task_index()
+        filtered_locations, filtered_companies, filtered_tasks = task_index.filter_options(location, company)
 
-        self.location_dropdown['values'] = ["Any"] + sorted(filtered_locations)
-        self.company_dropdown['values']  = ["Any"] + sorted(filtered_companies)
+        self.location_dropdown['values'] = ["Any"] + filtered_locations
+        self.company_dropdown['values']  = ["Any"] + filtered_companies
 
         if location != "Any" and company != "Any":
             # pull only this location+company
-            items = self.task_config[location][company]
-            names = [t["name"] if isinstance(t, dict) else t for t in items]
-            self.task_dropdown['values'] = ["Any"] + sorted(names)
+            self.task_dropdown['values'] = ["Any"] + sorted(task_index.tasks_for(location, company))
         else:
-            self.task_dropdown['values'] = ["Any"] + sorted(filtered_tasks)
+            self.task_dropdown['values'] = ["Any"] + filtered_tasks
 
         # finally re‐draw your shift cards
-        self.display_shifts(active, finished)
+        self.display_shifts()
+
+    def shift_matches(self, shift):
+        """Whether a shift passes the Shift Viewer filters."""
+        company, location, task_filter, lo, hi = self.shift_filter
+        if company != "Any" and shift.company != company:
+            return False
+        if location != "Any" and shift.location != location:
+            return False
+        if task_filter != "Any" and shift.task != task_filter:
+            return False
+        return lo <= shift.start < hi
+
+    def apply_shift_changes(self, changes):
+        """Update the Shift Viewer model from feed changes and redraw only the cards they touch."""
+        users_by_id = {u["id"]: u for u in self.users}
+        touched = set()
+        for change in changes:
+            key = change_key(change)
+            old = self.shift_model.get(key)
+            if change["type"] == "shift_deleted":
+                if self.shift_model.pop(key, None) is not None:
+                    touched.add(key)
+                continue
+            shift = change_to_shift(change)
+            if "task" not in change["shift"]:
+                # a bare clock-out; only matters for a shift already on screen
+                if old is None:
+                    continue
+                shift = old._replace(clock_out=shift.clock_out, end=shift.end)
+            if shift.user_id in users_by_id and self.shift_matches(shift):
+                self.shift_model[key] = shift
+                touched.add(key)
+            elif self.shift_model.pop(key, None) is not None:
+                touched.add(key)
+
+        for key in touched:
+            card = self.shift_cards.pop(key, None)
+            if card is not None:
+                card.destroy()
+            if key in self.shift_model:
+                self.shift_cards[key] = self.make_shift_card(self.shift_model[key])
+        self.layout_shift_cards()
 
     def show_handle_requests(self):
         self.clear_main_area()
+        self.current_page = "Handle Requests"
+        self.feed_cursor = read_changes()[1]
+        self.request_view = {}
 
         request_canvas = tk.Canvas(self.main_area, bg="#f4f4f4", highlightthickness=0)
         scrollbar = tk.Scrollbar(self.main_area, orient="vertical", command=request_canvas.yview)
@@ -250,36 +314,59 @@ class AdminApp(tk.Tk):
         for i in range(5):
             request_frame.grid_columnconfigure(i, weight=1, uniform="requests")
 
-        current_index = 0  # total cards placed
+        tk.Button(request_frame, text="Check Conflicts", command=self.check_request_conflicts)\
+            .grid(row=0, column=0, padx=10, pady=(10, 0), sticky="w")
+        status_filter = ttk.Combobox(request_frame, textvariable=self.request_status_var, state="readonly",
+                                     values=["All", "Pending", "Approved", "Rejected"], width=12)
+        status_filter.grid(row=0, column=1, padx=10, pady=(10, 0), sticky="w")
+        status_filter.bind("<<ComboboxSelected>>", lambda e: self.show_handle_requests())
 
-        for company in os.listdir(REQUESTS_FOLDER):
-            company_path = os.path.join(REQUESTS_FOLDER, company)
-            if not os.path.isdir(company_path):
-                continue
+        current_index = 0  # total cards placed
 
-            for filename in os.listdir(company_path):
-                if filename.endswith("_requests.json"):
-                    employee_name = filename.replace("_requests.json", "")
-                    filepath = os.path.join(company_path, filename)
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        try:
-                            requests = json.load(f)
-                        except json.JSONDecodeError:
-                            continue
-
-                        for req in requests:
-                            col = current_index % 5
-                            row = current_index // 5
-                            card = self.create_request_card(request_frame, employee_name, req, company, filepath)
-                            card.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
-                            current_index += 1
+        status = self.request_status_var.get()
+        for company, employee_name, req in self.load_all_requests(None if status == "All" else status):
+            col = current_index % 5
+            row = current_index // 5 + 1
+            self.request_view[req["id"]] = req
+            card = self.create_request_card(request_frame, employee_name, req, company)
+            card.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
+            current_index += 1
  
         # After all widgets are added, update scrollregion:
         request_frame.update_idletasks()
         request_canvas.config(scrollregion=request_canvas.bbox("all"))
 
+    def load_all_requests(self, status=None):
+        """Yield (company, employee id, request) for stored requests, optionally of one status."""
+        for req in load_requests(status):
+            yield req.get("company"), req["employee"], req
+
+    def check_request_conflicts(self):
+        """Check every pending request against the employee's existing shifts."""
+        lines = []
+        for company, employee, req in self.load_all_requests("pending"):
+            user = next((u for u in self.users if u["id"] == employee),
+                        {"id": employee, "company": company})
+            try:
+                start = iso_to_minutes(req["requested_start"])
+                end = iso_to_minutes(req["requested_end"])
+            except (KeyError, TypeError, ValueError):
+                lines.append(f"{employee}: invalid request times")
+                continue
+            conflicts = get_shift_interval_index(user).overlapping(start, end)
+            if conflicts:
+                lines.append(f"{employee} {self.format_time_readable(req['requested_start'])}: "
+                             f"overlaps {len(conflicts)} shift(s)")
+
+        if lines:
+            messagebox.showwarning("Request Conflicts", "\n".join(lines))
+        else:
+            messagebox.showinfo("Request Conflicts", "No pending request overlaps an existing shift.")
+
     def show_control_board(self):
         self.clear_main_area()
+        self.current_page = "Control Board"
+        self.feed_cursor = read_changes()[1]
 
         header = tk.Label(self.main_area, text="Currently Working – Company Overview", font=("Helvetica", 16, "bold"), bg="#f4f4f4", fg="#2e2e2e")
         header.pack(pady=20)
@@ -314,38 +401,65 @@ class AdminApp(tk.Tk):
             combo.pack(side="left", padx=(10,0))
 
 
-    def display_shifts(self, active, finished):
+    def display_shifts(self):
         container = tk.Frame(self.shift_frame, bg="#e0e0e0", bd=2, relief="groove")
         container.pack(padx=15, pady=10, fill="both", expand=True)
 
-        active_frame = tk.Frame(container, bg="#e0e0e0")
-        finished_frame = tk.Frame(container, bg="#e0e0e0")
-        active_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
-        finished_frame.grid(row=0, column=1, sticky="nsew", padx=10, pady=10)
+        self.active_frame = tk.Frame(container, bg="#e0e0e0")
+        self.finished_frame = tk.Frame(container, bg="#e0e0e0")
+        self.active_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
+        self.finished_frame.grid(row=0, column=1, sticky="nsew", padx=10, pady=10)
 
         container.grid_columnconfigure(0, weight=1)
         container.grid_columnconfigure(1, weight=1)
 
+        self.active_header = tk.Label(self.active_frame, text="Currently Working", font=("Helvetica", 14, "bold"), bg="#e0e0e0", fg="#f49301")
+        self.finished_header = tk.Label(self.finished_frame, text="Finished Shifts", font=("Helvetica", 14, "bold"), bg="#e0e0e0", fg="#2e7730")
+
+        self.shift_cards = {key: self.make_shift_card(shift) for key, shift in self.shift_model.items()}
+        self.layout_shift_cards()
+
+    def update_shift_summary(self):
+        """Hours of the shifts on screen, ongoing ones counted up to now, per company and location."""
+        table = ShiftTable(self.shift_model.values(), now=now_minutes())
+        text = f"{len(table)} shifts, {table.total():.1f} hrs"
+        for column in ("company", "location"):
+            totals = table.totals(column)
+            if len(totals) > 1:
+                text += "   |   " + ", ".join(f"{name}: {hours:.1f}" for name, hours in sorted(totals.items()))
+        self.shift_summary.config(text=text)
+
+    def make_shift_card(self, shift):
+        user = next(u for u in self.users if u["id"] == shift.user_id)
+        active = shift.end is None
         if active:
-            tk.Label(active_frame, text="Currently Working", font=("Helvetica", 14, "bold"), bg="#e0e0e0", fg="#f49301").grid(row=0, column=0, columnspan=2, sticky="w", padx=10, pady=5)
-            for idx, info in enumerate(active):
-                row = (idx // 2) + 1
-                col = idx % 2
-                self.make_card(info, True, active_frame).grid(row=row, column=col, padx=10, pady=5, sticky="nsew")
-
-        if finished:
-            tk.Label(finished_frame, text="Finished Shifts", font=("Helvetica", 14, "bold"), bg="#e0e0e0", fg="#2e7730").grid(row=0, column=0, columnspan=2, sticky="w", padx=10, pady=10)
-            for idx, info in enumerate(finished):
+            duration = format_duration_minutes(shift.start, now_minutes(), ongoing=True)
+        else:
+            duration = format_duration_minutes(shift.start, shift.end)
+        info = (user["name"], user["id"], shift.task, shift.location, shift.clock_in, shift.clock_out, duration)
+        return self.make_card(info, active, self.active_frame if active else self.finished_frame)
+
+    def layout_shift_cards(self):
+        """(Re)place the cards in model order; cards themselves are left alone."""
+        self.update_shift_summary()
+        active = [key for key, shift in self.shift_model.items() if shift.end is None]
+        finished = [key for key, shift in self.shift_model.items() if shift.end is not None]
+        for keys, header, pady in ((active, self.active_header, 5), (finished, self.finished_header, 10)):
+            if keys:
+                header.grid(row=0, column=0, columnspan=2, sticky="w", padx=10, pady=pady)
+            else:
+                header.grid_remove()
+            for idx, key in enumerate(keys):
                 row = (idx // 2) + 1
                 col = idx % 2
-                self.make_card(info, False, finished_frame).grid(row=row, column=col, padx=10, pady=5, sticky="nsew")
+                self.shift_cards[key].grid(row=row, column=col, padx=10, pady=5, sticky="nsew")
 
     def get_currently_working_summary(self):
         summary = {}
+        open_shifts = load_open_shifts()
         for user in self.users:
-            logs = load_employee_logs(user)
             # if any open shift, include user
-            if any(log.get("clock_out") is None for log in logs):
+            if user["id"] in open_shifts:
                 comp = user.get("company", "Unknown")
                 summary.setdefault(comp, []).append(user["name"])
         return summary
@@ -398,7 +512,7 @@ class AdminApp(tk.Tk):
         out_var = tk.StringVar(value=target.get("clock_out", ""))
 
         tk.Label(win, text="Location").pack()
-        loc_dropdown = ttk.Combobox(win, textvariable=loc_var, values=list(self.task_config.keys()))
+        loc_dropdown = ttk.Combobox(win, textvariable=loc_var, values=get_task_index().locations)
         loc_dropdown.pack()
 
         tk.Label(win, text="Task").pack()
@@ -408,7 +522,7 @@ class AdminApp(tk.Tk):
         def update_tasks(*args):
             loc = loc_var.get()
             company = user["company"]
-            tasks = self.task_config.get(loc, {}).get(company, [])
+            tasks = get_task_index().tasks_for(loc, company)
             task_dropdown["values"] = tasks
             if task_var.get() not in tasks:
                 task_var.set("")
@@ -420,10 +534,22 @@ class AdminApp(tk.Tk):
             tk.Entry(win, textvariable=var).pack()
 
         def save_changes():
+            try:
+                new_start = iso_to_minutes(in_var.get())
+                new_end = iso_to_minutes(out_var.get()) if out_var.get() else None
+            except ValueError:
+                return messagebox.showerror("Error", "Clock in/out must be ISO times, e.g. 2025-07-07T08:00.")
+            if new_end is not None:
+                overlaps = [s for s in get_shift_interval_index(user).overlapping(new_start, new_end)
+                            if s.clock_in != clock_in_time]
+                if overlaps and not messagebox.askyesno(
+                        "Overlapping Shifts",
+                        f"This shift overlaps {len(overlaps)} other shift(s) for {user['name']}. Save anyway?"):
+                    return
             target["location"] = loc_var.get()
             target["task"] = task_var.get()
             target["clock_in"] = in_var.get()
-            target["clock_out"] = out_var.get()
+            target["clock_out"] = out_var.get() or None
             save_employee_logs(user, logs)
             messagebox.showinfo("Saved", "Shift updated.")
             win.destroy()
@@ -459,33 +585,24 @@ class AdminApp(tk.Tk):
         logs = [log for log in logs if log["clock_in"] != clock_in_time]
         save_employee_logs(user, logs)
         self.refresh_shifts()
-    def remove_request(self, req, filepath):
+    def remove_request(self, req):
         try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                all_requests = json.load(f)
-            all_requests = [
-                r for r in all_requests
-                if r.get("requested_start") != req.get("requested_start") or r.get("requested_end") != req.get("requested_end")
-            ]
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(all_requests, f, indent=4, ensure_ascii=False)
+            delete_request(req["id"])
             messagebox.showinfo("Deleted", "Request successfully removed.")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to remove request:\n{e}")
             
-    def create_request_card(self, parent, employee, req, company, filepath):
+    def create_request_card(self, parent, employee, req, company):
         frame = tk.LabelFrame(parent, text=f"📝 Request from {employee}", bg="white", font=("Helvetica", 12, "bold"), padx=10, pady=5)
-        orig_start = req.get("requested_start")
-        orig_end = req.get("requested_end")
         
         def handle_finalize_click():
             status = req.get("status", "").lower()
             if status == "approved":
-                self.finalize_request(req, employee, company, filepath)
+                self.finalize_request(req, employee, company)
             elif status == "rejected":
                 confirm = messagebox.askyesno("Confirm Removal", f"Are you sure you want to delete the request from {employee}?")
                 if confirm:
-                    self.remove_request(req, filepath)
+                    self.remove_request(req)
                     self.show_handle_requests()
             else:
                 messagebox.showwarning("Pending", "Please approve or reject the request before proceeding.")
@@ -500,22 +617,10 @@ class AdminApp(tk.Tk):
         def update_status(event):
             new_status = status_var.get().lower()
             req["status"] = new_status
-            update_request_file(orig_start, orig_end)
+            update_request(req["id"], {"status": new_status})
             update_status_color()
             finalize_btn.config(text="Finalize" if new_status == "approved" else "Remove" if new_status == "rejected" else "Finalize")
 
-        def update_request_file(orig_start, orig_end):
-            with open(filepath, 'r', encoding='utf-8') as f:
-                all_requests = json.load(f)
-
-            for r in all_requests:
-                if r.get("requested_start") == orig_start and r.get("requested_end") == orig_end:
-                    r.update(req)
-                    break
-
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(all_requests, f, indent=4)
-
         def update_status_color():
             status_color = {
                 "pending": "#ffa500",
@@ -525,8 +630,6 @@ class AdminApp(tk.Tk):
             status_label.config(fg=status_color)
 
         def edit_request():
-            original_start = req.get("requested_start")
-            original_end = req.get("requested_end")
             edit_win = tk.Toplevel(self)
             edit_win.title("Edit Request")
             edit_win.geometry("400x350")
@@ -534,7 +637,7 @@ class AdminApp(tk.Tk):
             tk.Label(edit_win, text="Location:").pack()
             location_var = tk.StringVar(value=req.get("location", ""))
             location_dropdown = ttk.Combobox(edit_win, textvariable=location_var, state="readonly")
-            location_dropdown['values'] = sorted(list(self.task_config.keys()))
+            location_dropdown['values'] = get_task_index().locations
             location_dropdown.pack()
 
             tk.Label(edit_win, text="Task:").pack()
@@ -544,7 +647,7 @@ class AdminApp(tk.Tk):
 
             def update_tasks(*args):
                 loc = location_var.get()
-                task_list = self.task_config.get(loc, {}).get(company, [])
+                task_list = get_task_index().tasks_for(loc, company)
                 task_dropdown['values'] = sorted(task_list)
                 if task_var.get() not in task_list:
                     task_var.set("")  # Clear invalid selection
@@ -565,13 +668,15 @@ class AdminApp(tk.Tk):
             reason_entry = make_field("Reason", "reason", tk.Entry(edit_win))
 
             def save_changes():
-                req["location"] = location_var.get()
-                req["task"] = task_var.get()
-                req["requested_start"] = start_entry.get()
-                req["requested_end"] = end_entry.get()
-                req["reason"] = reason_entry.get()
-
-                update_request_file(original_start, original_end)
+                changes = {
+                    "location": location_var.get(),
+                    "task": task_var.get(),
+                    "requested_start": start_entry.get(),
+                    "requested_end": end_entry.get(),
+                    "reason": reason_entry.get()
+                }
+                req.update(changes)
+                update_request(req["id"], changes)
                 messagebox.showinfo("Updated", "Request updated successfully.")
                 edit_win.destroy()
                 self.show_handle_requests()
@@ -605,23 +710,18 @@ class AdminApp(tk.Tk):
 
         return frame
             
-    def finalize_request(self, req, employee, company, filepath):
-        def parse_dt(s):
-            try:
-                return datetime.fromisoformat(s)
-            except:
-                return None
-
+    def finalize_request(self, req, employee, company):
         if req["status"].lower() != "approved":
             messagebox.showwarning("Not Approved", "Only approved requests can be finalized.")
             return
 
-        log_path = os.path.join(COMPANY_FOLDER, company, f"{employee}.json")
-        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        user = next((u for u in self.users if u["id"] == employee),
+                    {"id": employee, "company": company})
 
-        new_start = parse_dt(req["requested_start"])
-        new_end = parse_dt(req["requested_end"])
-        if not new_start or not new_end:
+        try:
+            new_start = iso_to_minutes(req["requested_start"])
+            new_end = iso_to_minutes(req["requested_end"])
+        except (TypeError, ValueError):
             messagebox.showerror("Error", "Invalid date format in request.")
             return
 
@@ -632,62 +732,32 @@ class AdminApp(tk.Tk):
             "clock_out": req["requested_end"]
         }
 
-        conflicts = []  # <-- Initialize here
-
         try:
-            logs = []
-            if os.path.exists(log_path):
-                with open(log_path, "r", encoding="utf-8") as f:
-                    logs = json.load(f)
-
-            filtered_logs = []
-
-            for log in logs:
-                old_start = parse_dt(log.get("clock_in"))
-                old_end = parse_dt(log.get("clock_out"))
-                if not old_start or not old_end:
-                    filtered_logs.append(log)
-                    continue
-
-                # Check for overlap
-                if old_start < new_end and old_end > new_start:
-                    conflicts.append(log)
-                else:
-                    filtered_logs.append(log)
+            conflicts = get_shift_interval_index(user).overlapping(new_start, new_end)
 
             if conflicts:
                 print(f"[INFO] Found {len(conflicts)} conflicting shift(s). Replacing with request.")
                 for c in conflicts:
-                    print(f"[REMOVED] {c['clock_in']} to {c['clock_out']}")
-
-            # Add new entry
-            filtered_logs.append(new_entry)
+                    print(f"[REMOVED] {c.clock_in} to {c.clock_out}")
 
-            with open(log_path, "w", encoding="utf-8") as f:
-                json.dump(filtered_logs, f, indent=4, ensure_ascii=False)
+            replace_employee_shifts(user, conflicts, [new_entry])
 
         except Exception as e:
-            messagebox.showerror("File Error", f"Could not process {log_path}:\n{e}")
+            messagebox.showerror("File Error", f"Could not update shifts for {employee}:\n{e}")
             return
 
         # Remove the request
         try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                all_requests = json.load(f)
-            all_requests = [r for r in all_requests if not (
-                r.get("requested_start") == req.get("requested_start") and
-                r.get("requested_end") == req.get("requested_end")
-            )]
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(all_requests, f, indent=4, ensure_ascii=False)
+            delete_request(req["id"])
         except Exception as e:
-            messagebox.showerror("File Error", f"Could not update request file:\n{e}")
+            messagebox.showerror("File Error", f"Could not remove the request:\n{e}")
 
         messagebox.showinfo("Success", f"Finalized request and replaced {len(conflicts)} conflicting shift(s).")
         self.show_handle_requests()
 
     def show_edit_database(self):
         self.clear_main_area()
+        self.current_page = "Edit Database"
         self.build_hierarchical_db_tab(self.main_area)
 
     def build_users_tab(self, parent):
@@ -814,7 +884,7 @@ class AdminApp(tk.Tk):
         tk.Label(usersc, text="Users", font=("Helvetica", 14, "bold")).pack(pady=(5,10))
 
         tk.Label(usersc, text="Filter by Company:").pack(anchor="w", padx=5)
-        all_comps = sorted({c for loc in self.task_config for c in self.task_config[loc]})
+        all_comps = get_task_index().companies
         self.user_company_var = tk.StringVar()
         self.user_company_combo = ttk.Combobox(
             usersc, textvariable=self.user_company_var,
@@ -1,41 +1,26 @@
 import tkinter as tk
 from lib.dateandtime import DateAndTime
 from tktimepicker import SpinTimePickerOld, constants
-import os
 import sys
-import json
 from datetime import datetime
 from tkinter import messagebox, ttk
 from PIL import Image, ImageTk
-from lib.utils import (
-    load_users,
+from lib import outbox
+from lib.outbox import (
     get_user_by_pin,
-    load_employee_logs,
-    save_employee_logs,
-    create_shift_entry,
-    close_last_shift,
+    clock_in_user,
+    clock_out_user,
     is_clocked_in,
-    format_duration,
-    load_task_config,
-    get_tasks_for_user,
-    resource_path
+    get_task_index,
+    submit_request
 )
+from lib.utils import format_duration, resource_path
 
 # !!!CHANGE THIS TO CURRENT LOCATION OF THE LAPTOP!!!
 # ==================================================#
 LOCATION = "Reykjavíkuvegur 60, 220 Hafnafjörður"
 # ==================================================#
 
-def get_incomplete_tasks(task_config, company, location):
-    """
-    Return a list of task‐names for this company+location
-    whose 'completed' flag is False.
-    """
-    all_tasks = task_config.get(location, {}).get(company, [])
-    return [t["name"] for t in all_tasks if not t.get("completed", False)]
-
-
-users = load_users()
 
 class ShiftClockApp(tk.Tk):
     def __init__(self):
@@ -68,9 +53,7 @@ class ShiftClockApp(tk.Tk):
         self.task_frame.reset()
 
     def clock_out_and_return(self):
-        logs = load_employee_logs(self.user)
-        closed = close_last_shift(logs)
-        save_employee_logs(self.user, logs)
+        closed = clock_out_user(self.user)
         msg = format_duration(closed["clock_in"], closed["clock_out"]) if closed else "Not clocked in."
         messagebox.showinfo("Clocked Out", msg)
         self.task_frame.pack_forget()
@@ -105,7 +88,7 @@ class LoginFrame(tk.Frame):
 
     def check_pin(self, event=None):
         pin = self.pin_var.get()
-        user = get_user_by_pin(pin, users)
+        user = get_user_by_pin(pin)
         if user:
             self.pin_var.set("")
             self.master.switch_to_task(user)
@@ -115,8 +98,6 @@ class LoginFrame(tk.Frame):
 class RequestFormFrame(tk.Frame):
     def __init__(self, master):
         super().__init__(master)
-        
-        self.task_config = load_task_config()
 
         # Reason Text Area with Placeholder
         self.reason_text = tk.Text(self, height=5, width=40, fg='gray')
@@ -205,7 +186,7 @@ class RequestFormFrame(tk.Frame):
             
     def update_task_dropdown(self, event=None):
         user = self.master.user
-        tasks = get_incomplete_tasks(self.task_config, user["company"], LOCATION)
+        tasks = get_task_index().incomplete_tasks(LOCATION, user["company"])
 
         self.task_var.set("")
         self.task_dropdown.set("")
@@ -220,7 +201,7 @@ class RequestFormFrame(tk.Frame):
     # LOADS TASKS, RESETS DROPDOWNS, CLEARS REASON TEXT, START AND END ENTRIES AND SHIFT EDIT REQUEST SCREEN
     def reset(self):
         user = self.master.user
-        tasks = get_incomplete_tasks(self.task_config, user["company"], LOCATION)
+        tasks = get_task_index().incomplete_tasks(LOCATION, user["company"])
 
         self.task_dropdown["values"] = tasks
         self.task_var.set("")
@@ -274,20 +255,7 @@ class RequestFormFrame(tk.Frame):
             "status": "pending"
         }
 
-        path = os.path.join(resource_path("Database/requests"), user["company"], f"{user['id']}_requests.json")
-        folder = os.path.dirname(path)
-        if not os.path.exists(folder):
-            os.makedirs(folder)
-
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                requests = json.load(f)
-        else:
-            requests = []
-
-        requests.append(data)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(requests, f, indent=4)
+        submit_request(user, data)
 
         messagebox.showinfo("Request Submitted", "Your request has been sent.")
         self.master.back_to_task_view()
@@ -309,8 +277,6 @@ class TaskFrame(tk.Frame):
         self.container = tk.Frame(self, bg="#f0f0f0", bd=0, relief="flat", padx=5, pady=5)
         self.container.pack(fill="x", pady=5)
         
-        # Load task config
-        self.task_config = load_task_config()
         self.task_var = tk.StringVar()
 
         try:
@@ -399,7 +365,6 @@ class TaskFrame(tk.Frame):
 
     def clock_toggle(self):
         user = self.master.user
-        logs = load_employee_logs(user)
 
         if is_clocked_in(user):
             self.master.clock_out_and_return()
@@ -411,14 +376,13 @@ class TaskFrame(tk.Frame):
                 return
             task = task.strip()
             location = location.strip()
-            logs.append(create_shift_entry(task, location))
-            save_employee_logs(user, logs)
+            clock_in_user(user, task, location)
             messagebox.showinfo("Clocked In", f"Now working on '{task}' at '{location}'")
             self.master.log_out_without_clocking_out()  # Auto logout after clock-in
 
     def update_task_dropdown(self, *args):
         user = self.master.user
-        tasks = get_incomplete_tasks(self.task_config, user["company"], LOCATION)
+        tasks = get_task_index().incomplete_tasks(LOCATION, user["company"])
 
         self.task_var.set("")
         self.task_dropdown.set("")
@@ -435,5 +399,7 @@ class TaskFrame(tk.Frame):
 
 # Run the app
 if __name__ == "__main__":
+    outbox.start()  # punches go through the local outbox, see lib.outbox
     app = ShiftClockApp()
     app.mainloop()
+    outbox.stop()
@@ -0,0 +1,180 @@
+"""
+Clock service: one process that owns the Database folder (or shifts.db)
+and serves the storage calls of every terminal and admin view over a
+local socket, so they stop racing on the shared files.
+
+    python -m apps.clock_service [--address 127.0.0.1:8765]
+
+then start app.py / admin_view.py / the exporter with SHIFT_SERVICE set to
+the same address. The service hands out PINs and accepts writes, so it
+only listens on other addresses than loopback when SHIFT_SERVICE_TOKEN is
+set, and then answers only clients sending the same token. Users and task config are served from the in-memory
+snapshots, and punches go through the write-behind queue. Once a day
+(--snapshot-hours) the closed months of every shift log are snapshotted
+(lib.snapshot) between the terminals' calls.
+"""
+import argparse
+import asyncio
+import hmac
+import ipaddress
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from lib import snapshot, utils
+from lib.service_client import decode, encode, parse_address
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+SNAPSHOT_HOURS = 24
+SNAPSHOT_START_DELAY = 60  # seconds, so startup isn't slowed down by it
+
+
+def _storage_stamp(name):
+    return utils._storage_stamp(os.path.join(utils.DATABASE_FOLDER, os.path.basename(name)))
+
+CALLS = {
+    "storage_stamp": _storage_stamp,
+    "load_users": utils.get_users_snapshot,
+    "save_users": utils.save_users,
+    "load_task_config": utils.get_task_config_snapshot,
+    "save_task_config": utils.save_task_config,
+    "load_employee_logs": utils.load_employee_logs,
+    "load_shifts": utils.load_shifts,
+    "log_version": utils._log_version,
+    "save_employee_logs": utils.save_employee_logs,
+    "clock_in_user": utils.clock_in_user,
+    "clock_out_user": utils.clock_out_user,
+    "apply_clock_events": utils.apply_clock_events,
+    "load_open_shifts": utils.load_open_shifts,
+    "list_employee_ids": utils.list_employee_ids,
+    "list_companies": utils.list_companies,
+    "query_shifts": utils.query_shifts,
+    "shift_fingerprint": utils.shift_fingerprint,
+    "snapshot_employee_logs": utils.snapshot_employee_logs,
+    "load_requests": utils.load_requests,
+    "get_request": utils.get_request,
+    "submit_request": utils._store_request,
+    "update_request": utils.update_request,
+    "delete_request": utils.delete_request,
+    "read_changes": utils.read_changes,
+}
+
+# every call runs on this one thread, so the service is the only writer
+_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clock-service")
+
+
+def authorized(message):
+    if utils.SERVICE_TOKEN is None:
+        return True
+    token = message.get("token") if isinstance(message, dict) else None
+    return isinstance(token, str) and hmac.compare_digest(token.encode(), utils.SERVICE_TOKEN.encode())
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def well_formed(message):
+    return (isinstance(message, dict) and isinstance(message.get("call"), str)
+            and isinstance(message.get("args", []), list))
+
+
+def dispatch(message):
+    if not well_formed(message):
+        return {"error": "malformed request"}
+    fn = CALLS.get(message["call"])
+    if fn is None:
+        return {"error": f"unknown call {message['call']!r}"}
+    try:
+        return {"result": fn(*message.get("args", []))}
+    except OSError as e:
+        # the Database folder is unreachable; the caller should try again later
+        return {"error": f"{type(e).__name__}: {e}", "retry": True}
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+async def handle_client(reader, writer):
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                message = decode(line)
+            except ValueError as e:
+                reply = {"error": f"bad request: {e}"}
+            else:
+                if not authorized(message):
+                    # retry: the client's outbox keeps its events until the token is fixed
+                    writer.write(encode({"error": "wrong or missing SHIFT_SERVICE_TOKEN", "retry": True}))
+                    await writer.drain()
+                    break
+                reply = await loop.run_in_executor(_worker, dispatch, message)
+            writer.write(encode(reply))
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def _on_worker(fn, *args):
+    return _worker.submit(fn, *args).result()
+
+
+async def snapshot_loop(hours):
+    """
+    Run lib.snapshot every `hours`, one storage call at a time on the worker
+    thread. Untimed: the histories are not loaded just to time them.
+    """
+    loop = asyncio.get_running_loop()
+    await asyncio.sleep(SNAPSHOT_START_DELAY)
+    while True:
+        try:
+            report = await loop.run_in_executor(None, snapshot.run, None, _on_worker)
+            print(snapshot.format_report(report))
+        except Exception:
+            traceback.print_exc()
+        await asyncio.sleep(hours * 3600)
+
+
+async def serve(address, snapshot_hours=SNAPSHOT_HOURS):
+    host, port = parse_address(address)
+    server = await asyncio.start_server(handle_client, host, port)
+    print(f"Clock service on {host}:{port} serving {utils.DATABASE_FOLDER} ({utils.STORAGE_BACKEND})")
+    # keep a reference, the loop only holds tasks weakly
+    snapshots = asyncio.create_task(snapshot_loop(snapshot_hours)) if snapshot_hours > 0 else None
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve shift storage to the terminals over a local socket.")
+    parser.add_argument("--address", default=utils.SERVICE_ADDRESS or DEFAULT_ADDRESS,
+                        help=f"host:port to listen on (default {DEFAULT_ADDRESS})")
+    parser.add_argument("--snapshot-hours", type=float, default=SNAPSHOT_HOURS,
+                        help=f"hours between log snapshots, 0 to disable (default {SNAPSHOT_HOURS})")
+    args = parser.parse_args(argv)
+    if utils.SERVICE_TOKEN is None and not is_loopback(parse_address(args.address)[0]):
+        parser.error(f"set SHIFT_SERVICE_TOKEN before listening on {args.address}, "
+                     "the service hands out PINs and accepts writes")
+
+    utils.SERVICE_ADDRESS = None  # this process is the one that touches storage
+    utils.enable_write_behind()
+    try:
+        asyncio.run(serve(args.address, args.snapshot_hours))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        utils.flush_writes()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,32 @@
 import os
+import csv
 import json
+import argparse
+import hashlib
+import multiprocessing
+import time
 from collections import defaultdict
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from openpyxl import Workbook
 from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, Alignment
-from openpyxl.styles.borders import Border, Side
-
-from lib.utils import resource_path, load_task_config  # <- import the new loader
-
-COMPANY_FOLDER = resource_path("Database/Fyrirtaeki")
-EXPORT_FOLDER  = resource_path("Database/reports")
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Font, Alignment, NamedStyle
+from openpyxl.styles.borders import DEFAULT_BORDER, Border, Side
+from openpyxl.styles.fonts import DEFAULT_FONT
+
+from lib import utils
+from lib.aggregate import ShiftTable, shift_hours
+from lib.periods import add_period_arguments, month_period, period_from_args
+from lib.task_index import TaskIndex
+from lib.utils import (
+    EXPORT_FOLDER,
+    get_task_index,
+    get_users_snapshot,
+    minutes_to_datetime,
+    list_companies,
+    query_shifts
+)
 
 thin_gray = Border(
     left=Side(style="thin",  color="999999"),
@@ -30,184 +46,501 @@ def read_json(path):
         return json.load(f)
 
 def load_users():
-    return {u["id"]: u for u in read_json(resource_path("Database/users.json"))}
+    return {u["id"]: u for u in get_users_snapshot()}
 
 def ensure_folder(path):
     os.makedirs(path, exist_ok=True)
 
-def format_date(iso):
-    dt = datetime.fromisoformat(iso)
+def format_date(minutes):
+    dt = minutes_to_datetime(minutes)
     day = dt.day
     suffix = "th" if 11 <= day <= 13 else {1:"st",2:"nd",3:"rd"}.get(day%10,"th")
     return f"{day}{suffix} of {dt.strftime('%B')}"
 
-def compute_hours(start, end):
-    delta = datetime.fromisoformat(end) - datetime.fromisoformat(start)
-    return round(delta.total_seconds()/3600, 2)
-
-def export_company_to_excel(company_name):
-    # — load the enriched task config —
-    cfg = load_task_config()
+class ColumnWidths:
+    """
+    Longest value seen in each of the first `columns` columns, fed while
+    the rows are gathered: write-only sheets need their widths before the
+    first row is written.
+    """
+    def __init__(self, columns):
+        self.longest = [0] * columns
+
+    def add(self, values):
+        for col, value in enumerate(values[:len(self.longest)]):
+            if value is not None and len(str(value)) > self.longest[col]:
+                self.longest[col] = len(str(value))
+
+    def apply(self, ws):
+        """Set the widths the way the columns were always autosized: 12 to 30 characters."""
+        for col, longest in enumerate(self.longest, start=1):
+            ws.column_dimensions[get_column_letter(col)].width = max(12, min(longest + 2, 30))
+
+class ReportSheet(WriteOnlyWorksheet):
+    """
+    A write-only sheet that takes StyledRow cells as they are. openpyxl's
+    own append first tries each Cell as a plain value and only uses it
+    after the ValueError (and repr of the cell) that raises, which was a
+    third of the time spent writing a month of shifts. _values_to_row is
+    openpyxl's private hook, hence the <3.2 pin in requirements.txt;
+    tests/test_export_reports.py reads a report back to check it.
+    """
+    def _values_to_row(self, values, row_idx):
+        for col_idx, value in enumerate(values, 1):
+            if value is None:
+                continue
+            cell = value if isinstance(value, Cell) else WriteOnlyCell(self, value)
+            cell.column = col_idx
+            cell.row = row_idx
+            yield cell
+
+class ReportWorkbook(Workbook):
+    """A write-only workbook with the report's named styles, whose sheets are ReportSheets."""
+    def __init__(self):
+        super().__init__(write_only=True)
+        for name, style in REPORT_STYLES.items():
+            # whatever a style leaves out looks like a plain cell
+            style = {"font": DEFAULT_FONT, "border": DEFAULT_BORDER, **style}
+            self.add_named_style(NamedStyle(name, **style))
+
+    def create_sheet(self, title=None, index=None):
+        ws = ReportSheet(parent=self, title=title)
+        self._add_sheet(ws, index)
+        return ws
+
+class StyledRow:
+    """
+    Write-only cells given a named style once and refilled for every row
+    laid out the same way, so nothing is styled cell by cell. `styles`
+    overrides the style of single columns (1-based).
+    """
+    def __init__(self, ws, width, style=None, styles=None):
+        self.cells = []
+        for col in range(1, width + 1):
+            cell = WriteOnlyCell(ws)
+            col_style = (styles or {}).get(col, style)
+            if col_style:
+                cell.style = col_style
+            self.cells.append(cell)
+
+    def __call__(self, values):
+        for col, cell in enumerate(self.cells):
+            cell.value = values[col] if col < len(values) else None
+        return self.cells
+
+# bump when the workbook layout changes, so cached reports are rebuilt
+REPORT_FORMAT = 2
+EXPORT_CACHE_FILE = os.path.join(EXPORT_FOLDER, "export_cache.json")
+
+bold        = Font(bold=True, size=12)
+header_font = Font(bold=True)
+section_f   = Font(bold=True, size=14)
+center      = Alignment(horizontal="center")
+left        = Alignment(horizontal="left")
+
+# registered once per workbook by ReportWorkbook; they also show up in
+# Excel's Cell Styles for anyone extending a report by hand
+REPORT_STYLES = {
+    "Report title":        dict(font=section_f),
+    "Report section":      dict(font=section_f, alignment=left, border=thin_gray),
+    "Report header":       dict(font=header_font, alignment=center, border=thin_gray),
+    "Report cell":         dict(border=thin_gray),
+    "Report total":        dict(font=bold, border=thin_gray),
+    "Report table header": dict(font=header_font, alignment=center),
+}
+
+HEADERS      = ["Employee ID","Name","Location","Task","Clock In","Clock Out","Hours Worked"]
+TASK_HEADERS = ["Task Name","Total Hours","Completed?"]
+
+class CompanyHours:
+    """One company's closed shifts in a period, grouped the way its sheet lays them out."""
+    def __init__(self):
+        self.day_shifts  = defaultdict(list)  # day number -> rows, so days sort chronologically
+        self.day_totals  = {}
+        self.task_totals = {}
+        self.total_hours = 0.0
+        self.widths      = ColumnWidths(3)  # Employee ID, Name, Location
+
+def gather_hours(shifts, users):
+    """
+    CompanyHours for every company in `shifts`, plus the ShiftTable of the
+    closed ones that all the totals come from.
+    """
+    table = ShiftTable(shifts)
+    companies = defaultdict(CompanyHours)
+    for shift, hours in zip(table.shifts, table.hours_list()):
+        user = _user_for(users, shift)
+        company = companies[shift.company]
+        row = [
+            user["id"],
+            user["name"],
+            shift.location or "N/A",
+            shift.task or "N/A",
+            shift.clock_in[11:16],
+            shift.clock_out[11:16],
+            hours
+        ]
+        company.day_shifts[shift.start // 1440].append(row)
+        company.widths.add(row)
+    for (company, day), hours in table.totals("company", "day").items():
+        companies[company].day_totals[day] = hours
+    for (company, task), hours in table.totals("company", "task").items():
+        companies[company].task_totals[task] = hours
+    for company, hours in table.totals("company").items():
+        companies[company].total_hours = hours
+    return companies, table
+
+def _user_for(users, shift):
+    return users.get(shift.user_id, {"id":shift.user_id,"name":"Unknown"})
+
+def write_hours_sheet(ws, company_name, period, data, task_index=None):
+    """Stream the Work Hours layout for `data` (CompanyHours) into a write-only sheet."""
+    days = [(format_date(day * 1440), data.day_shifts[day], data.day_totals[day])
+            for day in sorted(data.day_shifts)]
+    empty_note = f"No shift data for {company_name} in {period.label}"
+    if data.task_totals:
+        comp_states = (task_index or get_task_index()).completion_for_company(company_name)
+        task_rows = [[task, round(hrs,2), "Yes" if comp_states.get(task, False) else "No"]
+                     for task, hrs in sorted(data.task_totals.items())]
+    else:
+        task_rows = [["No tasks","0.00","—"]]
+
+    # the shift rows were measured while gathering; add the rest of A-C
+    widths = data.widths
+    for date, _, _ in days:
+        widths.add([date])
+    for row in [HEADERS if days else [empty_note], ["Task Summary"], TASK_HEADERS] + task_rows:
+        widths.add(row)
+    widths.apply(ws)
+
+    date_row    = StyledRow(ws, 7, "Report section")
+    header_row  = StyledRow(ws, 7, "Report header")
+    shift_row   = StyledRow(ws, 7, "Report cell")
+    total_row   = StyledRow(ws, 7, "Report cell", styles={7: "Report total"})
+    section_row = StyledRow(ws, 7, "Report title")
+    task_header = StyledRow(ws, 3, "Report table header")
+    row = 0
+
+    def append(cells):
+        nonlocal row
+        ws.append(cells)
+        row += 1
+
+    if days:
+        for date, recs, day_total in days:
+            if row:
+                append([])
+                append([])
+            append(date_row([date]))
+            ws.merged_cells.add(f"A{row}:G{row}")
+            append(header_row(HEADERS))
+            for rec in recs:
+                append(shift_row(rec))
+            append(total_row([None]*6 + [f"Total: {round(day_total,2)} hrs"]))
+    else:
+        append(section_row([empty_note]))
 
-    task_totals = defaultdict(float)
-    day_shifts  = defaultdict(list)
-    total_hours = 0.0
+    # overall total
+    append([])
+    append(section_row([None]*6 + [f"Overall Total Hours: {round(data.total_hours,2)} hrs"]))
+    append([])
 
-    current_month = datetime.now().strftime("%B")
-    company_path   = os.path.join(COMPANY_FOLDER, company_name)
-    report_path    = os.path.join(EXPORT_FOLDER, f"{company_name}_{current_month}.xlsx")
+    # — Task Summary with completion state —
+    append(section_row(["Task Summary"]))
+    ws.merged_cells.add(f"A{row}:C{row}")
+    append(task_header(TASK_HEADERS))
+    for task_row in task_rows:
+        append(task_row)
+
+def export_company_to_excel(company_name, period=None, users=None, task_index=None):
+    """
+    Write {company}_{period key}.xlsx with the shifts clocked in during
+    `period` (lib.periods.Period, default the current month). users
+    (id -> user) and task_index are read from the Database folder unless
+    the caller already has them.
+    """
+    period = period or month_period()
+    report_path    = get_report_path(company_name, period)
     ensure_folder(EXPORT_FOLDER)
 
-    users = load_users()
+    if users is None:
+        users = load_users()
 
     # — gather data from each employee log —
-    for fn in os.listdir(company_path):
-        if not fn.endswith(".json"):
-            continue
-        eid  = fn[:-5]
-        user = users.get(eid, {"id":eid,"name":"Unknown"})
-        logs = read_json(os.path.join(company_path, fn))
-        for log in logs:
-            if not log.get("clock_in") or not log.get("clock_out"):
-                continue
-            start    = log["clock_in"]
-            end      = log["clock_out"]
-            date_lbl = format_date(start)
-            hours    = compute_hours(start, end)
-            total_hours += hours
-            task_name = log.get("task", "N/A")
-            task_totals[task_name] += hours
-
-            day_shifts[date_lbl].append([
-                user["id"],
-                user["name"],
-                log.get("location","N/A"),
-                task_name,
-                start[11:16],
-                end[11:16],
-                hours
-            ])
-
-    # — build workbook —
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Work Hours"
-
-    bold        = Font(bold=True, size=12)
-    header_font = Font(bold=True)
-    section_f   = Font(bold=True, size=14)
-    center      = Alignment(horizontal="center")
-    row = 1
-
-    if day_shifts:
-        for date in sorted(day_shifts):
-            if row>1: row += 2
-            top_row = row
-
-            # date header
-            ws.merge_cells(
-                start_row=row,
-                start_column=1,
-                end_row=row,
-                end_column=7
-            )
-            c = ws.cell(row=row, column=1, value=date)
-            c.font      = section_f
-            c.alignment = Alignment(horizontal="left")
-            row +=1
-
-            # column headers
-            headers=["Employee ID","Name","Location","Task","Clock In","Clock Out","Hours Worked"]
-            ws.append(headers)
-            for col in range(1,8):
-                cell = ws.cell(row=row, column=col)
-                cell.font      = header_font
-                cell.alignment = center
-            row+=1
-
-            # shifts
-            for rec in day_shifts[date]:
-                ws.append(rec)
-                row+=1
-
-            # day total
-            day_total = sum(r[-1] for r in day_shifts[date])
-            ws.append([""]*6 + [f"Total: {round(day_total,2)} hrs"])
-            ws.cell(row=row, column=7).font = bold
-
-            bottom = row
-            # gray border block
-            for r in range(top_row, bottom+1):
-                for c in range(1,8):
-                    ws.cell(row=r,column=c).border = thin_gray
-            row+=1
-    else:
-        ws.append([f"No shift data for {company_name} in {current_month}"])
-        ws.cell(row=row, column=1).font = section_f
-        row+=2
+    # only the month partitions overlapping the period are read
+    shifts = query_shifts(company=company_name, since=period.since, until=period.until)
+    data = gather_hours(shifts, users)[0].get(company_name, CompanyHours())
 
-    # overall total
-    ws.append([])
-    row+=1
-    ws.append([""]*6 + [f"Overall Total Hours: {round(total_hours,2)} hrs"])
-    ws.cell(row=row+1, column=7).font = section_f
-    row+=3
+    # — build workbook, streamed row by row —
+    wb = ReportWorkbook()
+    write_hours_sheet(wb.create_sheet("Work Hours"), company_name, period, data, task_index)
+    wb.save(report_path)
+    print(f"✅ Excel report written to: {report_path}")
 
-    # — Task Summary with completion state —
-    ws.append(["Task Summary"])
-
-    # “Task Summary” header (merge A–C for this row)
-    ws.merge_cells(
-        start_row=row,
-        start_column=1,
-        end_row=row,
-        end_column=3
-    )
-    ws.cell(row=row, column=1).font = section_f
-    row+=1
-
-    # headers: now three columns
-    ws.append(["Task Name","Total Hours","Completed?"])
-    for col, _ in enumerate(["Task Name","Total Hours","Completed?"], start=1):
-        ws.cell(row=row, column=col).font = header_font
-        ws.cell(row=row, column=col).alignment = center
-    row+=1
-
-    if task_totals:
-        # build a quick lookup of completion flags
-        # scan every location in cfg:
-        comp_states = {}
-        for loc, comps in cfg.items():
-            tasks = comps.get(company_name, [])
-            for item in tasks:
-                if isinstance(item, dict):
-                    comp_states[item["name"]] = item.get("completed", False)
-                else:
-                    comp_states[item] = False
-
-        for task, hrs in sorted(task_totals.items()):
-            done = comp_states.get(task, False)
-            ws.append([task, round(hrs,2), "Yes" if done else "No"])
-            row+=1
-    else:
-        ws.append(["No tasks","0.00","—"])
-        row+=1
 
-    # autosize first three columns
-    for col in range(1,4):
-        letter = get_column_letter(col)
-        maxlen = max(len(str(cell.value or "")) for cell in ws[letter])
-        ws.column_dimensions[letter].width = max(12, min(maxlen+2, 30))
+def get_report_path(company_name, period, fmt="xlsx"):
+    return os.path.join(EXPORT_FOLDER, f"{company_name}_{period.key}.{fmt}")
+
+def report_fingerprint(company_name, period, users, task_index):
+    """Hash of everything the company's report for `period` is built from."""
+    inputs = [
+        REPORT_FORMAT,
+        period,
+        utils.shift_fingerprint(company_name, period.since, period.until),
+        sorted((u["id"], u.get("name")) for u in users.values()),
+        task_index.completion_for_company(company_name),
+    ]
+    data = json.dumps(inputs, default=str, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+def read_export_cache():
+    """Report file name -> fingerprint of the inputs it was last built from."""
+    try:
+        return read_json(EXPORT_CACHE_FILE)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+SITE_HEADERS = ["Company","Task","Workers","Days","Hours"]
+
+def sheet_title(name):
+    """Excel sheet names can't hold []:*?/\\ and stop at 31 characters."""
+    for ch in "[]:*?/\\":
+        name = name.replace(ch, " ")
+    return name[:31]
+
+def get_site_report_path(period):
+    return os.path.join(EXPORT_FOLDER, f"Site summary_{period.key}.xlsx")
+
+def write_site_sheet(ws, period, table):
+    """Hours per location -> company -> task, from a ShiftTable of every company's shifts."""
+    hours   = table.totals("location", "company", "task")
+    workers = table.distinct("employee", "location", "company", "task")
+    days    = table.distinct("day", "location", "company", "task")
+    rows = defaultdict(list)  # location -> table rows
+    widths = ColumnWidths(2)  # Company, Task
+    for key in sorted(hours):
+        location, company, task = key
+        rows[location].append([company, task, workers[key], days[key], round(hours[key],2)])
+        widths.add(rows[location][-1])
+    location_hours   = table.totals("location")
+    location_workers = table.distinct("employee", "location")
+    location_days    = table.distinct("day", "location")
+
+    widths.add(SITE_HEADERS)
+    widths.add(["Total"])
+    widths.apply(ws)
+
+    title_row   = StyledRow(ws, 5, "Report title")
+    place_row   = StyledRow(ws, 5, "Report section")
+    header_row  = StyledRow(ws, 5, "Report header")
+    line_row    = StyledRow(ws, 5, "Report cell")
+    total_row   = StyledRow(ws, 5, "Report total")
+    row = 0
+
+    def append(cells):
+        nonlocal row
+        ws.append(cells)
+        row += 1
+
+    append(title_row([f"Site Summary, {period.label}"]))
+    ws.merged_cells.add(f"A{row}:E{row}")
+    if not rows:
+        append([])
+        append([f"No shift data in {period.label}"])
+    for loc, recs in rows.items():
+        append([])
+        append(place_row([loc]))
+        ws.merged_cells.add(f"A{row}:E{row}")
+        append(header_row(SITE_HEADERS))
+        for rec in recs:
+            append(line_row(rec))
+        append(total_row(["Total", None, location_workers[loc], location_days[loc],
+                          round(location_hours[loc],2)]))
+    append([])
+    append(title_row([None]*4 + [f"All locations: {round(table.total(),2)} hrs"]))
+
+def export_site_report(period=None, force=False):
+    """
+    One workbook for every company in `period`, built from a single pass
+    over all logs: a Site Summary sheet followed by each company's Work
+    Hours sheet. Skipped when no company's inputs changed, unless `force`.
+    """
+    start = time.perf_counter()
+    period = period or month_period()
+    report_path = get_site_report_path(period)
+    companies = list_companies()
+    users = {u["id"]: u for u in get_users_snapshot()}
+    task_index = get_task_index()
+
+    fingerprint = hashlib.sha1("".join(
+        report_fingerprint(c, period, users, task_index) for c in companies
+    ).encode("utf-8")).hexdigest()
+    cache = read_export_cache()
+    if not force and os.path.exists(report_path) and cache.get(os.path.basename(report_path)) == fingerprint:
+        print(f"Site summary for {period.label} unchanged: {report_path}")
+        return
+
+    # — one pass over every company's logs —
+    per_company, table = gather_hours(query_shifts(since=period.since, until=period.until), users)
+    for company in companies:
+        per_company.setdefault(company, CompanyHours())  # an empty company still gets its sheet
 
+    ensure_folder(EXPORT_FOLDER)
+    wb = ReportWorkbook()
+    write_site_sheet(wb.create_sheet("Site Summary"), period, table)
+    for company in sorted(per_company):
+        write_hours_sheet(wb.create_sheet(sheet_title(company)), company, period,
+                          per_company[company], task_index)
     wb.save(report_path)
-    print(f"✅ Excel report written to: {report_path}")
+
+    cache[os.path.basename(report_path)] = fingerprint
+    utils._write_json_atomic(EXPORT_CACHE_FILE, cache, indent=2, ensure_ascii=False)
+    print(f"✅ Site summary for {len(per_company)} companies written to: {report_path} "
+          f"({time.perf_counter() - start:.2f}s)")
 
 
-def export_all_companies():
-    for c in os.listdir(COMPANY_FOLDER):
-        if os.path.isdir(os.path.join(COMPANY_FOLDER,c)):
-            export_company_to_excel(c)
+# — flat exports: one row per closed shift, streamed straight from the logs —
+FLAT_FIELDS = ["company","employee_id","name","location","task","clock_in","clock_out","hours","shift_id"]
+
+def flat_rows(company_name, period, users):
+    """A dict per closed shift, read one employee log at a time."""
+    for shift in utils.iter_shifts(company=company_name, since=period.since, until=period.until):
+        if shift.end is None:
+            continue
+        yield {
+            "company": shift.company,
+            "employee_id": shift.user_id,
+            "name": _user_for(users, shift)["name"],
+            "location": shift.location or "N/A",
+            "task": shift.task or "N/A",
+            "clock_in": shift.clock_in,
+            "clock_out": shift.clock_out,
+            "hours": shift_hours(shift.start, shift.end),
+            "shift_id": shift.id,
+        }
+
+def write_csv(f, rows):
+    writer = csv.DictWriter(f, FLAT_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield
+
+def write_jsonl(f, rows):
+    for row in rows:
+        f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        yield
+
+FLAT_WRITERS = {"csv": write_csv, "jsonl": write_jsonl}
+
+def export_company_flat(company_name, period=None, fmt="csv", users=None):
+    """
+    Write {company}_{period key}.csv or .jsonl, one row per closed shift in
+    log order, without holding more than one employee log in memory.
+    """
+    period = period or month_period()
+    path = get_report_path(company_name, period, fmt)
+    ensure_folder(EXPORT_FOLDER)
+    if users is None:
+        users = load_users()
+
+    tmp = f"{path}.tmp"
+    # utf-8-sig so Excel opens the CSV with Icelandic names intact
+    with open(tmp, "w", newline="", encoding="utf-8-sig" if fmt == "csv" else "utf-8") as f:
+        count = sum(1 for _ in FLAT_WRITERS[fmt](f, flat_rows(company_name, period, users)))
+    os.replace(tmp, path)
+    print(f"✅ {count} shifts written to: {path}")
+
+
+# inputs shared by every company, set once in each worker process
+_shared = {}
+
+def _init_worker(period, users, task_config, fmt="xlsx"):
+    _shared["period"] = period
+    _shared["users"] = users
+    _shared["task_index"] = TaskIndex(task_config)
+    _shared["format"] = fmt
+
+def _timed_export(company):
+    start = time.perf_counter()
+    if _shared["format"] == "xlsx":
+        export_company_to_excel(company, _shared["period"], _shared["users"], _shared["task_index"])
+    else:
+        export_company_flat(company, _shared["period"], _shared["format"], _shared["users"])
+    return company, time.perf_counter() - start
+
+def export_all_companies(period=None, jobs=1, force=False, fmt="xlsx", companies=None):
+    """
+    Export every company (or just `companies`) for `period` (default the
+    current month) as `fmt` (xlsx, csv or jsonl), over `jobs` processes.
+    Users and task config are read once here and handed to the workers.
+    Reports whose inputs haven't changed since they were last written are
+    skipped, unless `force`.
+    """
+    period = period or month_period()
+    start = time.perf_counter()
+    companies = companies or list_companies()
+    # plain copies: the cached snapshots are read-only and don't pickle
+    users = {u["id"]: u for u in utils.load_users()}
+    task_config = utils.load_task_config()
+
+    cache = read_export_cache()
+    task_index = TaskIndex(task_config)
+    fingerprints = {c: report_fingerprint(c, period, users, task_index) for c in companies}
+    todo = [c for c in companies
+            if force or not os.path.exists(get_report_path(c, period, fmt))
+            or cache.get(os.path.basename(get_report_path(c, period, fmt))) != fingerprints[c]]
+
+    timings = []
+    if jobs > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(todo)),
+                                 initializer=_init_worker,
+                                 initargs=(period, users, task_config, fmt)) as pool:
+            for future in as_completed([pool.submit(_timed_export, c) for c in todo]):
+                timings.append(future.result())
+    else:
+        _init_worker(period, users, task_config, fmt)
+        timings = [_timed_export(c) for c in todo]
+
+    if timings:
+        for company, _ in timings:
+            cache[os.path.basename(get_report_path(company, period, fmt))] = fingerprints[company]
+        ensure_folder(EXPORT_FOLDER)
+        utils._write_json_atomic(EXPORT_CACHE_FILE, cache, indent=2, ensure_ascii=False)
+
+    seconds = dict(timings)
+    for company in companies:
+        print(f"  {company:<30} " + (f"{seconds[company]:6.2f}s" if company in seconds else " unchanged"))
+    print(f"Exported {len(timings)} of {len(companies)} companies for {period.label} "
+          f"in {time.perf_counter() - start:.2f}s "
+          f"({jobs} job{'s' if jobs != 1 else ''}, {sum(seconds.values()):.2f}s of exporting)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export every company's shifts to Excel reports or flat files.")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="companies to export at once in separate processes "
+                             f"(default 1, this machine has {os.cpu_count()} cores)")
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild every report, even those whose inputs haven't changed")
+    parser.add_argument("--site", action="store_true",
+                        help="write one Site summary workbook covering every company instead")
+    parser.add_argument("--format", choices=["xlsx", "csv", "jsonl"], default="xlsx",
+                        help="xlsx report (default), or one flat row per shift as CSV / JSON Lines")
+    parser.add_argument("--company", action="append", metavar="NAME",
+                        help="only this company (repeat for more)")
+    add_period_arguments(parser)
+    args = parser.parse_args(argv)
+    period = period_from_args(parser, args)
+    if args.site:
+        if args.format != "xlsx" or args.company:
+            parser.error("--site always covers every company as one xlsx workbook")
+        export_site_report(period, args.force)
+    else:
+        export_all_companies(period, max(1, args.jobs), args.force, args.format, args.company)
 
 
 if __name__=="__main__":
-    export_all_companies()
+    multiprocessing.freeze_support()  # the PyInstaller build starts workers from the exe
+    main()
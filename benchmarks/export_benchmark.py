@@ -0,0 +1,99 @@
+"""
+Excel export time for one company with a synthetic month of shifts.
+
+    python -m benchmarks.export_benchmark [--shifts 10000] [--repeat 3]
+
+Runs against a throwaway Database folder in a temp directory; prints the
+best of --repeat runs of export_company_to_excel, split into gathering the
+hours and writing the workbook.
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+COMPANY = "Bench"
+TASKS = ["Málning", "Pípulagnir", "Raflagnir", "Gólfefni", "Smíði", "Þrif"]
+LOCATIONS = ["Eyravegur 28-30, Selfoss", "Dalshverfi III, 230 Reykjanes", "Hafnarstræti 1"]
+
+
+def make_month(utils, shifts, month):
+    """A month of closed shifts for COMPANY, two a day per worker, about `shifts` in all."""
+    random.seed(1)
+    first = datetime.strptime(month, "%Y-%m")
+    days = ((first.replace(day=28) + timedelta(days=4)).replace(day=1) - first).days
+    workers = max(1, round(shifts / (2 * days)))
+    users = [{"id": f"worker{i:04d}", "name": f"Worker {i}", "company": COMPANY, "pin": str(100000 + i)}
+             for i in range(workers)]
+    utils._write_json_atomic(utils.USER_FILE, users, indent=4)
+    for user in users:
+        logs = []
+        for day in range(days):
+            t = first + timedelta(days=day, hours=7, minutes=random.randint(0, 90))
+            for _ in range(2):
+                end = t + timedelta(minutes=random.randint(60, 300))
+                logs.append({"id": uuid.uuid4().hex, "task": random.choice(TASKS),
+                             "location": random.choice(LOCATIONS),
+                             "clock_in": t.isoformat(), "clock_out": end.isoformat()})
+                t = end + timedelta(minutes=30)
+        utils.save_employee_logs(user, logs)
+    return workers * days * 2
+
+
+def time_export(exporter, period, repeat):
+    """Best seconds of `repeat` exports: (total, gathering hours, writing the workbook)."""
+    from lib import utils
+    best = None
+    for _ in range(repeat):
+        utils._log_file_cache.clear()
+        start = time.perf_counter()
+        shifts = utils.query_shifts(company=COMPANY, since=period.since, until=period.until)
+        exporter.gather_hours(shifts, exporter.load_users())
+        gathered = time.perf_counter() - start
+
+        utils._log_file_cache.clear()
+        start = time.perf_counter()
+        exporter.export_company_to_excel(COMPANY, period)
+        total = time.perf_counter() - start
+        run = (total, gathered, total - gathered)
+        best = run if best is None or run[0] < best[0] else best
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--shifts", type=int, default=10000)
+    parser.add_argument("--month", default="2025-07", help="YYYY-MM of the synthetic shifts")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="export-bench-")
+    os.environ["SHIFT_DATABASE"] = os.path.join(tmp, "Database")
+    os.environ["SHIFT_STORAGE"] = "json"
+    os.environ.pop("SHIFT_SERVICE", None)
+    try:
+        from lib import utils
+        from lib.periods import month_period
+        from apps import export_company_reports as exporter
+        os.makedirs(utils.DATABASE_FOLDER)
+        shutil.copy(os.path.join(os.path.dirname(__file__), "..", "Database", "task_config.json"),
+                    utils.TASK_FILE)
+        count = make_month(utils, args.shifts, args.month)
+        period = month_period(args.month)
+
+        total, gathered, written = time_export(exporter, period, args.repeat)
+        size = os.path.getsize(exporter.get_report_path(COMPANY, period))
+        print(f"{count} shifts in {period.label}, best of {args.repeat}")
+        print(f"  export        {total:7.3f} s   {1e6 * total / count:6.1f} us per shift   ({size:,} bytes)")
+        print(f"    gathering   {gathered:7.3f} s")
+        print(f"    workbook    {written:7.3f} s")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Punch throughput: a shift-change burst of clock-ins followed by clock-outs,
+written synchronously, through the employee app's outbox (lib.outbox, synced
+in the background to the JSON folder) and through the clock service's
+write-behind queue.
+
+    python -m benchmarks.punch_benchmark [--workers 60] [--rounds 5] [--window 0.2]
+
+Runs against a throwaway Database folder and outbox in a temp directory.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+
+def run(store, workers, rounds, flush):
+    """
+    Seconds spent in store's clock_in_user/clock_out_user calls, and seconds
+    until flush() has made everything durable in the Database folder.
+    """
+    users = [{"id": f"worker{i:03d}", "company": "Bench"} for i in range(workers)]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for user in users:
+            store.clock_in_user(user, "Task", "Site")
+        for user in users:
+            store.clock_out_user(user)
+    punched = time.perf_counter() - start
+    flush()
+    return punched, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=60)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--window", type=float, default=0.2)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="punch-bench-")
+    os.environ["SHIFT_DATABASE"] = os.path.join(tmp, "Database")
+    os.environ["SHIFT_STORAGE"] = "json"
+    os.environ["SHIFT_OUTBOX"] = os.path.join(tmp, "Outbox")
+    os.environ.pop("SHIFT_SERVICE", None)
+    try:
+        from lib import outbox, utils
+        punches = 2 * args.workers * args.rounds
+
+        sync_punch, sync_total = run(utils, args.workers, args.rounds, utils.flush_writes)
+        # as app.py runs it: punches land in the outbox, a thread syncs them
+        outbox.start()
+        ob_punch, ob_total = run(outbox, args.workers, args.rounds, outbox.stop)
+        # as the clock service runs it
+        utils.enable_write_behind(args.window)
+        wb_punch, wb_total = run(utils, args.workers, args.rounds, utils.flush_writes)
+
+        print(f"{punches} punches ({args.workers} workers x {args.rounds} rounds, in and out)")
+        print(f"  synchronous   {punches / sync_total:9.0f} punches/s   "
+              f"{1000 * sync_punch / punches:7.3f} ms per punch")
+        print(f"  outbox        {punches / ob_total:9.0f} punches/s   "
+              f"{1000 * ob_punch / punches:7.3f} ms per punch   (employee app, incl. final sync)")
+        print(f"  write-behind  {punches / wb_total:9.0f} punches/s   "
+              f"{1000 * wb_punch / punches:7.3f} ms per punch   (clock service, window {args.window}s, "
+              f"incl. final flush)")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
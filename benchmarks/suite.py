@@ -0,0 +1,214 @@
+"""
+Hot paths of lib.utils, the admin view and the exporter, timed against a
+synthetic Database (benchmarks.synthetic).
+
+    python -m benchmarks.suite [--users 200] [--years 2] [--storage sqlite]
+                               [--database DIR] [--output FILE] [--compare FILE]
+
+Generates the dataset in a temp directory (or uses an existing --database
+folder), runs each benchmark --repeat times and writes the results as JSON
+(default benchmark-<commit>-<storage>.json), so two versions can be
+compared with --compare.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks import synthetic
+from lib.periods import month_period
+
+
+def gather_shift_viewer(utils, users_by_id, company, days):
+    """
+    The data half of AdminView.refresh_shifts: feed cursor, the shifts of
+    the last `days` days and the dropdown options, without the widgets.
+    """
+    today = date.today()
+    since = today - timedelta(days=days - 1)
+    lo, hi = utils.date_to_minutes(since), utils.date_to_minutes(today + timedelta(days=1))
+    utils.read_changes()
+    model, used = {}, set()
+    for shift in utils.query_shifts(None if company == "Any" else company, since=since, until=today):
+        if shift.user_id not in users_by_id:
+            continue
+        used.add((shift.location, shift.task, shift.company))
+        if lo <= shift.start < hi:
+            model[utils.shift_key(shift)] = shift
+    utils.get_task_index().filter_options("Any", company)
+    return model
+
+
+def request_conflicts(utils, requests, users_by_id):
+    """The checks AdminView.finalize_request makes: shifts each request would replace."""
+    found = 0
+    for req in requests:
+        user = users_by_id.get(req["employee"], {"id": req["employee"], "company": req["company"]})
+        start, end = utils.iso_to_minutes(req["requested_start"]), utils.iso_to_minutes(req["requested_end"])
+        found += len(utils.get_shift_interval_index(user).overlapping(start, end))
+    return found
+
+
+def cold(utils):
+    """Forget everything parsed from the logs, as in a freshly started app."""
+    utils._log_file_cache.clear()
+    utils._interval_cache.clear()
+
+
+def benchmarks(utils, exporter, sample, rng):
+    """(name, calls, setup, run) for every benchmark; setup runs untimed before each repeat."""
+    users = list(utils.get_users_snapshot())
+    users_by_id = {u["id"]: u for u in users}
+    pins = [u["pin"] for u in rng.choices(users, k=1000)] + ["no such pin"] * 10
+    some = rng.sample(users, min(sample, len(users)))
+    logs = {u["id"]: utils.load_employee_logs(u) for u in some}
+    requests = utils.load_requests()
+    by_company = {}
+    for u in users:
+        by_company[u["company"]] = by_company.get(u["company"], 0) + 1
+    company = max(sorted(by_company), key=by_company.get)
+    period = month_period("last")
+    nothing = lambda: None
+
+    def first_pin():
+        utils.invalidate_cache("users")
+
+    def export():
+        with contextlib.redirect_stdout(io.StringIO()):
+            exporter.export_company_to_excel(company, period)
+
+    return [
+        ("get_user_by_pin", len(pins), nothing,
+         lambda: [utils.get_user_by_pin(pin) for pin in pins]),
+        ("get_user_by_pin.after_users_change", 1, first_pin,
+         lambda: utils.get_user_by_pin(pins[0])),
+        ("is_clocked_in", len(users), nothing,
+         lambda: [utils.is_clocked_in(u) for u in users]),
+        ("load_employee_logs.cold", len(users), lambda: cold(utils),
+         lambda: [utils.load_employee_logs(u) for u in users]),
+        ("load_employee_logs.cached", len(users), nothing,
+         lambda: [utils.load_employee_logs(u) for u in users]),
+        ("save_employee_logs", len(some), nothing,
+         lambda: [utils.save_employee_logs(u, logs[u["id"]]) for u in some]),
+        ("refresh_shifts.today", 1, nothing,
+         lambda: gather_shift_viewer(utils, users_by_id, "Any", 1)),
+        ("refresh_shifts.last_7_days", 1, nothing,
+         lambda: gather_shift_viewer(utils, users_by_id, "Any", 7)),
+        ("refresh_shifts.last_30_days.cold", 1, lambda: cold(utils),
+         lambda: gather_shift_viewer(utils, users_by_id, "Any", 30)),
+        ("refresh_shifts.last_30_days", 1, nothing,
+         lambda: gather_shift_viewer(utils, users_by_id, "Any", 30)),
+        ("refresh_shifts.last_30_days.one_company", 1, nothing,
+         lambda: gather_shift_viewer(utils, users_by_id, company, 30)),
+        ("finalize_request.conflicts.cold", len(requests), lambda: cold(utils),
+         lambda: request_conflicts(utils, requests, users_by_id)),
+        ("finalize_request.conflicts.cached", len(requests), nothing,
+         lambda: request_conflicts(utils, requests, users_by_id)),
+        ("export_company_to_excel", 1, lambda: cold(utils), export),
+    ]
+
+
+def run_all(utils, exporter, repeat, sample, seed, only=None):
+    rng = random.Random(seed)
+    results = {}
+    for name, calls, setup, run in benchmarks(utils, exporter, sample, rng):
+        if only and not any(part in name for part in only):
+            continue
+        times = []
+        for _ in range(repeat):
+            setup()
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        utils.flush_writes()
+        results[name] = {"calls": calls, "best_s": min(times), "median_s": statistics.median(times),
+                         "per_call_us": 1e6 * min(times) / calls}
+        print(f"  {name:<42} {calls:>6} calls  {results[name]['per_call_us']:>12.1f} us/call  "
+              f"(best {min(times):.4f}s)")
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print each benchmark's time per call against a results file from another version."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\ncompared with {baseline_path} (commit {baseline.get('commit')}):")
+    for name, result in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"  {name:<42} {'new':>12}")
+            continue
+        ratio = result["per_call_us"] / old["per_call_us"] if old["per_call_us"] else float("inf")
+        print(f"  {name:<42} {old['per_call_us']:>12.1f} -> {result['per_call_us']:.1f} us/call  "
+              f"({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    synthetic.add_dataset_arguments(parser)
+    parser.add_argument("--database", metavar="DIR",
+                        help="use this Database folder (e.g. made by benchmarks.synthetic) instead "
+                             "of generating one; its logs are saved back unchanged and reports written")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sample", type=int, default=20, help="users whose logs are saved back")
+    parser.add_argument("--only", action="append", metavar="NAME",
+                        help="only benchmarks whose name contains this (repeat for more)")
+    parser.add_argument("--output", metavar="FILE", help="results JSON (default benchmark-<commit>-<storage>.json)")
+    parser.add_argument("--compare", metavar="FILE", help="results JSON of another version to compare with")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.database:
+        os.environ["SHIFT_DATABASE"] = os.path.abspath(args.database)
+    else:
+        tmp = tempfile.mkdtemp(prefix="suite-bench-")
+        os.environ["SHIFT_DATABASE"] = os.path.join(tmp, "Database")
+    os.environ["SHIFT_STORAGE"] = args.storage
+    os.environ.pop("SHIFT_SERVICE", None)
+    try:
+        from lib import utils
+        from apps import export_company_reports as exporter
+        report = {"commit": git_commit(), "created": datetime.now().isoformat(timespec="seconds"),
+                  "python": sys.version.split()[0], "platform": platform.platform(),
+                  "storage": args.storage, "repeat": args.repeat}
+        if tmp:
+            start = time.perf_counter()
+            report["dataset"] = synthetic.generate(utils, **synthetic.dataset_options(args))
+            report["generate_s"] = time.perf_counter() - start
+            print(f"generated {report['dataset']['shifts']:,} shifts of {args.users} users, "
+                  f"{report['dataset']['requests']} requests in {report['generate_s']:.1f}s")
+        else:
+            report["dataset"] = {"database": os.environ["SHIFT_DATABASE"]}
+        report["results"] = run_all(utils, exporter, args.repeat, args.sample, args.seed, args.only)
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    output = args.output or f"benchmark-{report['commit'] or 'local'}-{args.storage}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"results written to {output}")
+    if args.compare:
+        compare(report["results"], args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Synthetic Database folders for benchmarks: locations, companies and tasks
+laid out like task_config.json, users with PINs, years of weekday shifts
+(some still clocked in) and shift edit requests. Everything is written
+through lib.utils, so it lands in whatever SHIFT_DATABASE/SHIFT_STORAGE
+point at.
+
+    python -m benchmarks.synthetic DIR [--users 200] [--years 2] [--storage json]
+
+writes DIR/Database (DIR must not hold one yet) and prints what it made.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+
+def task_config(locations, companies, tasks, rng):
+    """{location: {company: [{"name", "completed"}]}}, every company working on one to three sites."""
+    sites = [f"Vinnusvæði {i + 1}, {rng.randrange(100, 999)} Selfoss" for i in range(locations)]
+    names = [f"Fyrirtæki {i + 1}" for i in range(companies)]
+    cfg = {site: {} for site in sites}
+    for company in names:
+        for site in rng.sample(sites, min(len(sites), rng.randint(1, 3))):
+            cfg[site][company] = [{"name": f"Verkþáttur {j + 1} ({company})", "completed": rng.random() < 0.2}
+                                  for j in range(tasks)]
+    return cfg
+
+
+def make_users(count, cfg, rng):
+    """`count` users spread over the companies in cfg, each with a unique PIN."""
+    companies = sorted({company for site in cfg.values() for company in site})
+    width = max(4, len(str(count)))
+    return [{"id": f"user{i:05d}", "name": f"Starfsmaður {i}", "company": rng.choice(companies),
+             "pin": str(i).zfill(width)}
+            for i in range(count)]
+
+
+def make_logs(user, cfg, first, last, rng, clocked_in=False):
+    """One or two shifts every weekday from first to last, and an open shift today if clocked_in."""
+    jobs = [(site, task["name"]) for site, companies in cfg.items()
+            for task in companies.get(user["company"], [])]
+    logs = []
+    day = first
+    while day <= last:
+        if day.weekday() < 5:
+            t = datetime.combine(day, datetime.min.time()) + timedelta(hours=7, minutes=rng.randint(0, 90))
+            for _ in range(rng.choice((1, 1, 2))):
+                site, task = rng.choice(jobs)
+                end = t + timedelta(minutes=rng.randint(120, 300))
+                logs.append({"id": "%032x" % rng.getrandbits(128), "task": task, "location": site,
+                             "clock_in": t.isoformat(), "clock_out": end.isoformat()})
+                t = end + timedelta(minutes=30)
+        day += timedelta(days=1)
+    if clocked_in:
+        site, task = rng.choice(jobs)
+        start = datetime.now().replace(second=0, microsecond=0) - timedelta(minutes=rng.randint(10, 300))
+        logs.append({"id": "%032x" % rng.getrandbits(128), "task": task, "location": site,
+                     "clock_in": start.isoformat(), "clock_out": None})
+    return logs
+
+
+def make_request(user, logs, rng):
+    """A request correcting one of the user's shifts, the way the employee app files them."""
+    log = rng.choice([log for log in logs if log["clock_out"]])
+    start = datetime.fromisoformat(log["clock_in"]) - timedelta(minutes=rng.choice((0, 15, 30)))
+    end = datetime.fromisoformat(log["clock_out"]) + timedelta(minutes=rng.choice((0, 30, 60)))
+    return {
+        "task": log["task"],
+        "location": log["location"],
+        "company": user["company"],
+        "requested_start": start.isoformat(sep=" "),
+        "requested_end": end.isoformat(sep=" "),
+        "reason": "Gleymdi að stimpla mig út",
+        "status": rng.choice(("pending", "pending", "pending", "approved", "denied")),
+    }
+
+
+def generate(utils, locations=3, companies=8, tasks=6, users=200, years=2.0, requests=500,
+             clocked_in=0.1, seed=1):
+    """
+    Fill utils.DATABASE_FOLDER with a synthetic site, shifts ending
+    yesterday. Returns counts of what was written.
+    """
+    rng = random.Random(seed)
+    os.makedirs(utils.DATABASE_FOLDER, exist_ok=True)
+    cfg = task_config(locations, companies, tasks, rng)
+    people = make_users(users, cfg, rng)
+    utils.save_task_config(cfg)
+    utils.save_users(people)
+
+    last = date.today() - timedelta(days=1)
+    first = last - timedelta(days=round(365 * years))
+    shifts = 0
+    open_shifts = 0
+    filed = 0
+    for n, user in enumerate(people):
+        logs = make_logs(user, cfg, first, last, rng, rng.random() < clocked_in)
+        utils.save_employee_logs(user, logs)
+        shifts += len(logs)
+        open_shifts += logs[-1]["clock_out"] is None
+        # requests spread evenly over the users
+        for _ in range(requests * (n + 1) // users - filed):
+            utils.submit_request(user, make_request(user, logs, rng))
+            filed += 1
+    utils.flush_writes()
+    return {"locations": locations, "companies": companies, "tasks": tasks, "users": users,
+            "years": years, "first_day": first.isoformat(), "last_day": last.isoformat(),
+            "shifts": shifts, "clocked_in": open_shifts, "requests": filed, "seed": seed}
+
+
+def add_dataset_arguments(parser):
+    group = parser.add_argument_group("synthetic data")
+    group.add_argument("--locations", type=int, default=3)
+    group.add_argument("--companies", type=int, default=8)
+    group.add_argument("--tasks", type=int, default=6, help="tasks per company and location")
+    group.add_argument("--users", type=int, default=200)
+    group.add_argument("--years", type=float, default=2.0, help="of weekday shifts, ending yesterday")
+    group.add_argument("--requests", type=int, default=500)
+    group.add_argument("--clocked-in", type=float, default=0.1, help="share of users clocked in now")
+    group.add_argument("--seed", type=int, default=1)
+    group.add_argument("--storage", choices=["json", "sqlite"], default="json")
+
+
+def dataset_options(args):
+    return {"locations": args.locations, "companies": args.companies, "tasks": args.tasks,
+            "users": args.users, "years": args.years, "requests": args.requests,
+            "clocked_in": args.clocked_in, "seed": args.seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("folder", help="where to create the Database folder")
+    add_dataset_arguments(parser)
+    args = parser.parse_args()
+
+    database = os.path.join(os.path.abspath(args.folder), "Database")
+    if os.path.exists(database):
+        parser.error(f"{database} already exists")
+    os.environ["SHIFT_DATABASE"] = database
+    os.environ["SHIFT_STORAGE"] = args.storage
+    os.environ.pop("SHIFT_SERVICE", None)
+    from lib import utils
+
+    start = time.perf_counter()
+    counts = generate(utils, **dataset_options(args))
+    print(f"{counts['shifts']:,} shifts of {counts['users']} users in {counts['companies']} companies "
+          f"({counts['first_day']} to {counts['last_day']}), {counts['clocked_in']} clocked in, "
+          f"{counts['requests']} requests: {database} ({time.perf_counter() - start:.1f}s)")
+    print(f"use it with: SHIFT_DATABASE={database} SHIFT_STORAGE={args.storage}")
+
+
+if __name__ == "__main__":
+    main()
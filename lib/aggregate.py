@@ -0,0 +1,139 @@
+"""
+Columnar hours aggregation for the reports and the admin view.
+
+ShiftTable packs Shift records into parallel columns (a code per employee,
+company, task and location, start/end in epoch minutes) and answers
+totals per day/task/employee/location/company, or any combination, with
+group-bys over those columns. NumPy does the group-bys when it is
+installed; without it the columns are array.array and the group-bys plain
+loops, with the same results.
+"""
+import array
+from collections import defaultdict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+LABELED = ("employee", "company", "task", "location")
+COLUMNS = LABELED + ("day",)
+
+
+def shift_hours(start, end):
+    """Hours between two epoch-minute timestamps, rounded the way the reports show them."""
+    return round((end - start) / 60, 2)
+
+
+class ShiftTable:
+    """
+    Closed shifts as columns. Open shifts are left out, or counted up to
+    `now` (epoch minutes) when it is given. Tasks and locations that are
+    missing are grouped under `missing`.
+    """
+
+    def __init__(self, shifts, now=None, missing="N/A"):
+        self.labels = {col: [] for col in LABELED}
+        lookup = {col: {} for col in LABELED}
+        codes = {col: [] for col in LABELED}
+        starts, ends = [], []
+        self.shifts = []  # the rows kept, in table order
+        for shift in shifts:
+            end = shift.end if shift.end is not None else now
+            if end is None:
+                continue
+            values = (shift.user_id, shift.company, shift.task or missing, shift.location or missing)
+            for col, value in zip(LABELED, values):
+                code = lookup[col].get(value)
+                if code is None:
+                    code = lookup[col][value] = len(self.labels[col])
+                    self.labels[col].append(value)
+                codes[col].append(code)
+            starts.append(shift.start)
+            ends.append(end)
+            self.shifts.append(shift)
+
+        if np is not None:
+            self.columns = {col: np.asarray(codes[col], dtype=np.int64) for col in LABELED}
+            start = np.asarray(starts, dtype=np.int64)
+            end = np.asarray(ends, dtype=np.int64)
+            self.columns["day"] = start // 1440
+            # rounded per shift, the way the reports always showed them
+            self.hours = np.round((end - start) / 60, 2)
+        else:
+            self.columns = {col: array.array("q", codes[col]) for col in LABELED}
+            self.columns["day"] = array.array("q", (s // 1440 for s in starts))
+            self.hours = array.array("d", (shift_hours(s, e) for s, e in zip(starts, ends)))
+
+    def __len__(self):
+        return len(self.shifts)
+
+    def hours_list(self):
+        """Hours of each shift as plain floats, in table order."""
+        return self.hours.tolist()
+
+    def total(self):
+        return float(self.hours.sum()) if np is not None else sum(self.hours)
+
+    def _label(self, col, code):
+        return code if col == "day" else self.labels[col][code]
+
+    def _key(self, by):
+        """
+        One int64 per shift combining the codes of the `by` columns, and a
+        function turning such a key back into labels.
+        """
+        key = np.zeros(len(self), dtype=np.int64)
+        radix = []
+        for col in by:
+            codes = self.columns[col]
+            low = int(codes.min()) if len(self) else 0
+            size = int(codes.max()) - low + 1 if len(self) else 1
+            key = key * size + (codes - low)
+            radix.append((col, low, size))
+
+        def decode(k):
+            labels = []
+            for col, low, size in reversed(radix):
+                k, code = divmod(k, size)
+                labels.append(self._label(col, code + low))
+            labels.reverse()
+            return labels[0] if len(labels) == 1 else tuple(labels)
+        return key, decode
+
+    def totals(self, *by):
+        """Hours per group of the `by` columns ("day", "task", ...): label (or tuple of labels) -> hours."""
+        for col in by:
+            if col not in COLUMNS:
+                raise ValueError(f"unknown column {col!r}, expected one of {COLUMNS}")
+        if np is not None:
+            key, decode = self._key(by)
+            groups, inverse = np.unique(key, return_inverse=True)
+            sums = np.bincount(inverse, weights=self.hours, minlength=len(groups))
+            return {decode(int(k)): float(h) for k, h in zip(groups, sums)}
+        result = defaultdict(float)
+        for codes, hours in zip(zip(*(self.columns[col] for col in by)), self.hours):
+            result[codes] += hours
+        return {self._decode_codes(by, codes): hours for codes, hours in result.items()}
+
+    def distinct(self, of, *by):
+        """How many different `of` values (employees, days, ...) each group of `by` has."""
+        for col in (of,) + by:
+            if col not in COLUMNS:
+                raise ValueError(f"unknown column {col!r}, expected one of {COLUMNS}")
+        if np is not None:
+            key, decode = self._key(by)
+            codes = self.columns[of]
+            low = int(codes.min()) if len(self) else 0
+            size = int(codes.max()) - low + 1 if len(self) else 1
+            pairs = np.unique(key * size + (codes - low))  # each (group, value) once
+            groups, counts = np.unique(pairs // size, return_counts=True)
+            return {decode(int(k)): int(n) for k, n in zip(groups, counts)}
+        seen = defaultdict(set)
+        for codes, value in zip(zip(*(self.columns[col] for col in by)), self.columns[of]):
+            seen[codes].add(value)
+        return {self._decode_codes(by, codes): len(values) for codes, values in seen.items()}
+
+    def _decode_codes(self, by, codes):
+        labels = tuple(self._label(col, code) for col, code in zip(by, codes))
+        return labels[0] if len(labels) == 1 else labels
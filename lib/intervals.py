@@ -0,0 +1,53 @@
+from bisect import bisect_left
+from typing import Any, Iterable, List, Tuple
+
+
+class IntervalIndex:
+    """
+    Static index over half-open intervals [start, end) for overlap queries.
+
+    Intervals are kept sorted by start in an implicit binary tree where every
+    node stores the largest end below it. A query only walks subtrees that
+    start before the query ends and reach past its start, so it costs
+    O((k + 1) log n) for k hits instead of scanning all n intervals.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[int, int, Any]]):
+        ordered = sorted(intervals, key=lambda iv: iv[0])
+        self._starts = [iv[0] for iv in ordered]
+        self._items = [iv[2] for iv in ordered]
+
+        size = 1
+        while size < len(ordered):
+            size *= 2
+        self._size = size
+        tree = [float("-inf")] * (2 * size)
+        for i, iv in enumerate(ordered):
+            tree[size + i] = iv[1]
+        for node in range(size - 1, 0, -1):
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+        self._max_end = tree
+
+    def __len__(self):
+        return len(self._items)
+
+    def overlapping(self, start: int, end: int) -> List[Any]:
+        """Items whose interval overlaps [start, end), in start order."""
+        # only intervals starting before `end` can overlap
+        limit = bisect_left(self._starts, end)
+        if limit == 0:
+            return []
+        found = []
+        stack = [(1, 0, self._size)]
+        while stack:
+            node, lo, hi = stack.pop()
+            if lo >= limit or self._max_end[node] <= start:
+                continue
+            if node >= self._size:
+                found.append(lo)
+                continue
+            mid = (lo + hi) // 2
+            # right child first so results pop off in start order
+            stack.append((2 * node + 1, mid, hi))
+            stack.append((2 * node, lo, mid))
+        return [self._items[i] for i in found]
@@ -0,0 +1,28 @@
+"""
+One-shot data migrations for the JSON Database folder.
+
+    python -m lib.migrate partitions    <-- split {company}/{id}.json logs into month files
+    python -m lib.migrate requests      <-- merge {company}/{id}_requests.json files into requests.jsonl
+"""
+import sys
+
+from lib.utils import COMPANY_FOLDER, REQUESTS_FILE, migrate_employee_logs, migrate_requests
+
+
+def main(argv):
+    if argv == ["partitions"]:
+        count = migrate_employee_logs()
+        print(f"Split {count} employee logs into month partitions under {COMPANY_FOLDER}")
+    elif argv == ["requests"]:
+        try:
+            count = migrate_requests()
+        except FileExistsError as e:
+            print(f"Nothing to do: {e}")
+            return
+        print(f"Moved {count} requests into {REQUESTS_FILE}")
+    else:
+        print(__doc__.strip())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,342 @@
+"""
+Offline outbox for the employee terminals.
+
+Site laptops lose the shared Database drive (or the clock service) now and
+then. The terminal therefore writes every punch and shift edit request to
+a local outbox first (LOCAL_FOLDER/outbox.jsonl, fsynced) and a background
+thread replays it to the central store in order, in batches, as soon as the
+store can be reached. Every event has an event_id, clock events carry their
+shift id and requests their request id, so replaying something that
+already arrived changes nothing. An event the store refuses (or a line
+that can't be read back) is moved to LOCAL_FOLDER/outbox.rejected.jsonl
+so the events behind it still get through.
+
+While offline, logins, task lists and clocked-in status come from the last
+copies read from the central store (LOCAL_FOLDER/cache/) plus whatever is
+still waiting in the outbox.
+
+SHIFT_OUTBOX overrides LOCAL_FOLDER.
+"""
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+
+import appdirs
+
+from lib import utils
+from lib.service_client import ServiceUnavailable
+from lib.task_index import TaskIndex
+
+LOCAL_FOLDER = os.environ.get("SHIFT_OUTBOX") or appdirs.user_data_dir("ShiftManager", appauthor=False)
+SYNC_BATCH = 500      # events per commit to the central store
+SYNC_WINDOW = 0.2     # seconds to wait after a punch, so a burst is synced together
+RETRY_INTERVAL = 30   # seconds between sync attempts while offline
+
+# the central store can't be reached: shared drive gone or clock service down
+OFFLINE_ERRORS = (OSError, ServiceUnavailable)
+
+
+class Outbox:
+    """
+    Append-only JSON Lines file of events plus a cursor file holding the
+    byte offset up to which they have been delivered. Both are removed once
+    everything is delivered. Refused events go to a dead-letter file.
+    """
+
+    def __init__(self, folder):
+        self.path = os.path.join(folder, "outbox.jsonl")
+        self.cursor_path = os.path.join(folder, "outbox.cursor")
+        self.rejected_path = os.path.join(folder, "outbox.rejected.jsonl")
+        self._lock = threading.Lock()
+
+    def append(self, event):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _read_cursor(self):
+        try:
+            with open(self.cursor_path, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _write_cursor(self, offset):
+        tmp = f"{self.cursor_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.cursor_path)
+
+    def _entries(self):
+        """(end offset, event) for every complete undelivered line."""
+        entries = []
+        offset = self._read_cursor()
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return entries
+        with f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn last line from a crash mid-append
+                offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    event = None
+                if not isinstance(event, dict):
+                    # handed to deliver like any event; it gets refused and set aside
+                    event = {"kind": "unreadable", "line": line.decode("utf-8", "replace").rstrip("\n")}
+                entries.append((offset, event))
+        return entries
+
+    def pending(self):
+        """Undelivered events, oldest first."""
+        return [event for _, event in self._entries()]
+
+    def drain(self, deliver):
+        """
+        Hand undelivered events to deliver(events) in batches of SYNC_BATCH,
+        advancing the cursor after each. Returns how many were handled. If
+        deliver raises one of OFFLINE_ERRORS the rest stay queued; any other
+        error means the store refused something, so the batch is retried one
+        event at a time and the refused ones are set aside with reject().
+        """
+        entries = self._entries()
+        for i in range(0, len(entries), SYNC_BATCH):
+            batch = entries[i:i + SYNC_BATCH]
+            try:
+                deliver([event for _, event in batch])
+            except OFFLINE_ERRORS:
+                raise
+            except Exception:
+                for end, event in batch:
+                    try:
+                        deliver([event])
+                    except OFFLINE_ERRORS:
+                        raise
+                    except Exception as e:
+                        self.reject(event, e)
+                    self._advance(end)
+            else:
+                self._advance(batch[-1][0])
+        return len(entries)
+
+    def _advance(self, end):
+        with self._lock:
+            if end == os.path.getsize(self.path):
+                # all delivered and nothing appended meanwhile; drop the
+                # cursor first so a crash in between only causes a replay
+                if os.path.exists(self.cursor_path):
+                    os.remove(self.cursor_path)
+                os.remove(self.path)
+            else:
+                self._write_cursor(end)
+
+    def reject(self, event, error):
+        """Move an event the store refused to the dead-letter file, with the reason."""
+        print(f"[WARN] outbox event {event.get('event_id')} refused, moved to "
+              f"{self.rejected_path}: {type(error).__name__}: {error}")
+        record = {"rejected_at": datetime.now().isoformat(timespec="seconds"),
+                  "error": f"{type(error).__name__}: {error}", "event": event}
+        with open(self.rejected_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+_outbox = Outbox(LOCAL_FOLDER)
+_wake = threading.Event()
+_sync_thread = None
+_sync_lock = threading.Lock()
+
+
+def _require_store():
+    """
+    Raise FileNotFoundError when the Database folder is gone (drive not
+    mapped), before lib.utils would quietly create a fresh empty one.
+    """
+    if utils.SERVICE_ADDRESS is None and not os.path.isdir(utils.DATABASE_FOLDER):
+        raise FileNotFoundError(f"Database folder not reachable: {utils.DATABASE_FOLDER}")
+
+
+# === LOCAL COPIES === #
+
+_cache_sources = {}  # name -> snapshot last written, to skip rewriting it
+
+def _cache_path(name):
+    return os.path.join(LOCAL_FOLDER, "cache", f"{name}.json")
+
+def _save_cache(name, data):
+    path = _cache_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def _save_snapshot(name, snapshot):
+    if _cache_sources.get(name) is not snapshot:
+        _save_cache(name, snapshot)
+        _cache_sources[name] = snapshot
+
+def _load_cache(name, default):
+    try:
+        with open(_cache_path(name), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+# === TERMINAL CALLS === #
+# Same names and results as the lib.utils functions the employee app used.
+
+def get_user_by_pin(pin):
+    try:
+        _require_store()
+        users = utils.get_users_snapshot()
+    except OFFLINE_ERRORS:
+        return utils.get_user_by_pin(pin, _load_cache("users", []))
+    _save_snapshot("users", users)
+    return utils.get_user_by_pin(pin)
+
+_offline_task_index = None
+
+def get_task_index():
+    global _offline_task_index
+    try:
+        _require_store()
+        cfg = utils.get_task_config_snapshot()
+    except OFFLINE_ERRORS:
+        if _offline_task_index is None:
+            _offline_task_index = TaskIndex(_load_cache("task_config", {}))
+        return _offline_task_index
+    _save_snapshot("task_config", cfg)
+    _offline_task_index = None
+    return utils.get_task_index()
+
+def load_open_shifts():
+    """The central open-shift index (or its last copy) with undelivered punches applied."""
+    pending = _outbox.pending()
+    if not pending:
+        try:
+            _require_store()
+            index = utils.load_open_shifts()
+        except OFFLINE_ERRORS:
+            return _load_cache("open_shifts", {})
+        _save_cache("open_shifts", index)
+        return index
+    index = _load_cache("open_shifts", {})
+    for event in pending:
+        if event["kind"] == "clock":
+            utils._apply_open_event(index, event["user"], event["event"])
+    return index
+
+def is_clocked_in(user):
+    return user["id"] in load_open_shifts()
+
+def clock_in_user(user, task, location):
+    entry = utils.create_shift_entry(task, location)
+    _record({"kind": "clock", "user": _user_ref(user), "event": {"event": "clock_in", **entry}})
+    return entry
+
+def clock_out_user(user):
+    """Close the user's open shift. Returns the closed shift or None."""
+    shift = load_open_shifts().get(user["id"])
+    if shift is None:
+        return None
+    closed = {k: v for k, v in shift.items() if k != "company"}
+    closed["clock_out"] = utils.now_trimmed()
+    _record({"kind": "clock", "user": _user_ref(user), "event": {
+        "event": "clock_out",
+        "id": closed.get("id"),
+        "clock_in": closed["clock_in"],
+        "clock_out": closed["clock_out"]
+    }})
+    return closed
+
+def submit_request(user, data):
+    req = utils.new_request(user, data)
+    _record({"kind": "request", "request": req})
+    return req
+
+def _user_ref(user):
+    return {"id": user["id"], "company": user["company"]}  # no PIN in the outbox
+
+def _record(event):
+    _outbox.append({"event_id": uuid.uuid4().hex, **event})
+    if _sync_thread is None:
+        _try_sync()
+    else:
+        _wake.set()
+
+
+# === SYNC === #
+
+def _deliver(events):
+    _require_store()
+    clocks = []
+    for event in events:
+        if event["kind"] not in ("clock", "request"):
+            raise ValueError(f"not an outbox event: {event}")
+        if event["kind"] == "clock":
+            clocks.append((event["user"], event["event"]))
+            continue
+        if clocks:
+            utils.apply_clock_events(clocks)
+            clocks = []
+        utils.add_request(event["request"])
+    if clocks:
+        utils.apply_clock_events(clocks)
+
+def sync():
+    """
+    Replay the outbox to the central store. Returns how many events were
+    handled (delivered or set aside as refused); raises one of
+    OFFLINE_ERRORS (keeping the rest) if the store is unreachable.
+    """
+    with _sync_lock:
+        delivered = _outbox.drain(_deliver)
+        if delivered:
+            _save_cache("open_shifts", utils.load_open_shifts())
+        return delivered
+
+def _run():
+    while True:
+        _wake.wait(RETRY_INTERVAL)
+        _wake.clear()
+        time.sleep(SYNC_WINDOW)
+        _try_sync()
+
+def _try_sync():
+    """sync(), staying quiet while offline and logging anything else instead of raising."""
+    try:
+        sync()
+    except OFFLINE_ERRORS:
+        pass
+    except Exception:
+        traceback.print_exc()
+
+def start():
+    """Sync in the background from now on (and right away, for anything left from last time)."""
+    global _sync_thread
+    if _sync_thread is None:
+        _sync_thread = threading.Thread(target=_run, name="outbox-sync", daemon=True)
+        _sync_thread.start()
+        _wake.set()
+
+def stop():
+    """Last sync attempt before exit; whatever can't be delivered stays for next time."""
+    _try_sync()
@@ -0,0 +1,75 @@
+"""
+Report periods: a calendar month, an ISO week or an arbitrary range of
+days, with the --month/--week/--start/--end options the exporters share.
+"""
+from datetime import date, timedelta
+from typing import NamedTuple
+
+
+class Period(NamedTuple):
+    since: date   # first day, inclusive
+    until: date   # last day, inclusive
+    key: str      # for file names: "2025-07", "2025-W27", "2025-07-01_2025-07-15"
+    label: str    # for people: "July 2025", "week 27 of 2025", ...
+
+
+def month_period(value="this", today=None):
+    """A calendar month: "YYYY-MM", "this" or "last"."""
+    today = today or date.today()
+    if value in ("this", "last"):
+        first = today.replace(day=1)
+        if value == "last":
+            first = (first - timedelta(days=1)).replace(day=1)
+    else:
+        year, month = value.split("-")
+        first = date(int(year), int(month), 1)
+    last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return Period(first, last, first.strftime("%Y-%m"), first.strftime("%B %Y"))
+
+
+def week_period(value="this", today=None):
+    """An ISO week (Monday to Sunday): "YYYY-Www", "this" or "last"."""
+    today = today or date.today()
+    if value in ("this", "last"):
+        monday = today - timedelta(days=today.weekday())
+        if value == "last":
+            monday -= timedelta(weeks=1)
+    else:
+        year, week = value.upper().split("-W")
+        monday = date.fromisocalendar(int(year), int(week), 1)
+    year, week, _ = monday.isocalendar()
+    return Period(monday, monday + timedelta(days=6), f"{year}-W{week:02d}", f"week {week} of {year}")
+
+
+def range_period(start, end):
+    """Every day from start to end (date or "YYYY-MM-DD"), inclusive."""
+    start, end = (d if isinstance(d, date) else date.fromisoformat(d) for d in (start, end))
+    if end < start:
+        raise ValueError(f"period ends ({end}) before it starts ({start})")
+    return Period(start, end, f"{start}_{end}",
+                  f"{start.strftime('%d %b %Y')} - {end.strftime('%d %b %Y')}")
+
+
+def add_period_arguments(parser):
+    group = parser.add_argument_group("period (default: the current month)")
+    group.add_argument("--month", metavar="YYYY-MM", help='a calendar month, or "this"/"last"')
+    group.add_argument("--week", metavar="YYYY-Www", help='an ISO week, or "this"/"last"')
+    group.add_argument("--start", metavar="YYYY-MM-DD", help="first day of a custom range")
+    group.add_argument("--end", metavar="YYYY-MM-DD", help="last day of a custom range (default: today)")
+
+
+def period_from_args(parser, args):
+    """The Period chosen with add_period_arguments' options; errors out through the parser."""
+    chosen = [name for name in ("month", "week", "start") if getattr(args, name)]
+    if len(chosen) > 1:
+        parser.error("choose one of --month, --week or --start/--end")
+    if args.end and not args.start:
+        parser.error("--end needs --start")
+    try:
+        if args.week:
+            return week_period(args.week)
+        if args.start:
+            return range_period(args.start, args.end or date.today())
+        return month_period(args.month or "this")
+    except ValueError as e:
+        parser.error(f"bad period: {e}")
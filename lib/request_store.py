@@ -0,0 +1,184 @@
+import json
+import os
+import tempfile
+import uuid
+from typing import Any, Dict, List, Optional
+
+from lib.filelock import FileLock
+
+# rewrite the file once this many lines hold superseded versions or deletions
+COMPACT_STALE_LINES = 256
+
+
+class RequestStore:
+    """
+    All shift edit requests in one JSON Lines file (Database/requests/requests.jsonl).
+
+    The first line is a header with a generation id that changes every time
+    the file is rewritten. Every other line is one version of a request,
+    identified by its "id": submitting appends a request, a status change
+    or edit appends the new version of that one request (the last line for
+    an id wins), and {"id": ..., "deleted": true} removes it. Readers keep
+    the live requests keyed by id with indexes by status and company, and
+    on refresh only read the bytes appended since last time (or everything,
+    if the generation changed).
+
+    Every write runs under `lock` (a FileLock shared by all processes
+    using the store, lib.utils passes the Database folder's store lock),
+    so appends, read-modify-write updates and rewrites don't race.
+    """
+
+    def __init__(self, path: str, lock: Optional[FileLock] = None):
+        self.path = path
+        self.lock = lock or FileLock(f"{path}.lock")
+        self._reset()
+
+    # --- reading --- #
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _reset(self):
+        self._generation = None
+        self._offset = 0
+        self._stale = 0       # lines that no longer hold a live request
+        self._next_seq = 0
+        self._missing_ids = False
+        self._requests: Dict[str, Dict[str, Any]] = {}
+        self._seq: Dict[str, int] = {}  # id -> submission order
+        self._by_status: Dict[str, set] = {}
+        self._by_company: Dict[str, set] = {}
+
+    def _unindex(self, rid):
+        old = self._requests.pop(rid, None)
+        if old is not None:
+            self._by_status[old.get("status", "pending").lower()].discard(rid)
+            self._by_company[old.get("company")].discard(rid)
+            self._stale += 1
+        return old
+
+    def _apply(self, req):
+        rid = req.get("id")
+        if rid is None:
+            # written before requests had ids, see missing_ids()
+            rid = req["id"] = f"legacy-{self._next_seq}"
+            self._missing_ids = True
+        self._unindex(rid)
+        if req.get("deleted"):
+            self._seq.pop(rid, None)
+            self._stale += 1
+            return
+        if rid not in self._seq:
+            self._seq[rid] = self._next_seq
+            self._next_seq += 1
+        self._requests[rid] = req
+        self._by_status.setdefault(req.get("status", "pending").lower(), set()).add(rid)
+        self._by_company.setdefault(req.get("company"), set()).add(rid)
+
+    def refresh(self):
+        if not self.exists():
+            self._reset()
+            return
+        with open(self.path, "rb") as f:
+            header = f.readline()
+            try:
+                generation = json.loads(header)["generation"]
+            except (json.JSONDecodeError, KeyError):
+                generation = None
+            if generation != self._generation or os.fstat(f.fileno()).st_size < self._offset:
+                self._reset()
+                self._generation = generation
+                self._offset = f.tell()
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # half-written append, pick it up next time
+                self._offset += len(line)
+                line = line.strip()
+                if line:
+                    self._apply(json.loads(line))
+
+    def load(self, status: Optional[str] = None, company: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Copies of the live requests, oldest submission first."""
+        self.refresh()
+        if status:
+            ids = self._by_status.get(status.lower(), set())
+            if company:
+                ids = ids & self._by_company.get(company, set())
+        elif company:
+            ids = self._by_company.get(company, set())
+        else:
+            ids = self._requests
+        return [dict(self._requests[rid]) for rid in sorted(ids, key=self._seq.__getitem__)]
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        self.refresh()
+        req = self._requests.get(request_id)
+        return dict(req) if req is not None else None
+
+    def missing_ids(self) -> bool:
+        """True if some stored request has no id yet (its placeholder id isn't stable)."""
+        self.refresh()
+        return self._missing_ids
+
+    # --- writing --- #
+
+    def _write_header(self, f):
+        f.write(json.dumps({"store": "requests", "generation": uuid.uuid4().hex}) + "\n")
+
+    def append(self, req: Dict[str, Any]):
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            new_file = not self.exists()
+            with open(self.path, "a", encoding="utf-8") as f:
+                if new_file:
+                    self._write_header(f)
+                f.write(json.dumps(req, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def update(self, request_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Append a new version of one request with `changes` applied; None if it doesn't exist."""
+        with self.lock:
+            req = self.get(request_id)
+            if req is None:
+                return None
+            req.update(changes)
+            req["id"] = request_id
+            self.append(req)
+            self._maybe_compact()
+        return req
+
+    def delete(self, request_id: str) -> bool:
+        with self.lock:
+            if self.get(request_id) is None:
+                return False
+            self.append({"id": request_id, "deleted": True})
+            self._maybe_compact()
+        return True
+
+    def _maybe_compact(self):
+        with self.lock:
+            self.refresh()
+            if self._stale >= COMPACT_STALE_LINES and self._stale > len(self._requests):
+                self.rewrite(self.load())
+
+    def rewrite(self, requests: List[Dict[str, Any]]):
+        """Replace the whole store (temp file + rename) under a new generation."""
+        with self.lock:
+            folder = os.path.dirname(self.path)
+            os.makedirs(folder, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=folder, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+            try:
+                with open(fd, "w", encoding="utf-8") as f:
+                    self._write_header(f)
+                    for req in requests:
+                        f.write(json.dumps(req, ensure_ascii=False) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            self._reset()
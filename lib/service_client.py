@@ -0,0 +1,205 @@
+"""
+Client for the clock service (apps/clock_service.py), used as the storage
+backend when SHIFT_SERVICE=host:port is set. lib.utils forwards its storage
+calls to the functions here, which send them to the service; the apps stay
+unchanged.
+
+Wire format: one JSON object per line each way over a TCP connection,
+{"call": name, "args": [...], "token": SHIFT_SERVICE_TOKEN} -> {"result": ...}
+or {"error": message}, with "retry": true added when the service's own
+storage was unreachable or the token was wrong, rather than the call being
+refused. The token is only a shared password, sent in the clear.
+Dates and Shift records are tagged so they survive the round trip.
+"""
+import json
+import os
+import select
+import socket
+import threading
+from datetime import date
+
+from lib import utils
+
+
+class ServiceError(RuntimeError):
+    """The clock service refused a call or failed running it."""
+
+
+class ServiceUnavailable(ServiceError):
+    """The clock service, or the Database folder behind it, could not be reached."""
+
+
+# === ENCODING === #
+
+def _default(obj):
+    if isinstance(obj, date):
+        return {"__date__": obj.isoformat()}
+    raise TypeError(f"can't send {type(obj).__name__} to the clock service")
+
+def _object_hook(obj):
+    if "__shift__" in obj:
+        return utils.Shift(*obj["__shift__"])
+    if "__date__" in obj:
+        return date.fromisoformat(obj["__date__"])
+    return obj
+
+def encode(message):
+    return (json.dumps(_tag_shifts(message), default=_default, ensure_ascii=False) + "\n").encode("utf-8")
+
+def _tag_shifts(obj):
+    # Shift is a tuple, so it has to be tagged before json turns it into a list
+    if isinstance(obj, utils.Shift):
+        return {"__shift__": _tag_shifts(list(obj))}
+    if isinstance(obj, (list, tuple)):
+        return [_tag_shifts(v) for v in obj]
+    if isinstance(obj, dict):
+        return {k: _tag_shifts(v) for k, v in obj.items()}
+    return obj
+
+def decode(line):
+    return json.loads(line, object_hook=_object_hook)
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+# === CONNECTION === #
+
+_lock = threading.Lock()
+_sock = None
+_reader = None
+
+def _connect():
+    global _sock, _reader
+    _sock = socket.create_connection(parse_address(utils.SERVICE_ADDRESS), timeout=10)
+    _sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    _reader = _sock.makefile("rb")
+
+def _close():
+    global _sock, _reader
+    for handle in (_reader, _sock):
+        if handle is not None:
+            try:
+                handle.close()
+            except OSError:
+                pass
+    _sock = _reader = None
+
+def _stale():
+    """Whether the service closed the connection since the last call (readable while nothing is owed)."""
+    try:
+        return bool(select.select([_sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+def call(name, *args):
+    """
+    Run one storage call on the service and return its result. A call is
+    only sent again if it could not be written to an old connection; once
+    it is written, a lost or late reply raises ServiceUnavailable, as the
+    service may have run it already.
+    """
+    message = encode({"call": name, "args": args, "token": utils.SERVICE_TOKEN})
+    with _lock:
+        try:
+            reused = _sock is not None and not _stale()
+            if not reused:
+                _close()
+                _connect()
+            try:
+                _sock.sendall(message)
+            except OSError:
+                if not reused:
+                    raise
+                # the service was restarted and this connection went with it
+                _close()
+                _connect()
+                _sock.sendall(message)
+            line = _reader.readline()
+            if not line:
+                raise ConnectionError("connection closed by the clock service")
+        except OSError as e:
+            _close()
+            raise ServiceUnavailable(f"clock service at {utils.SERVICE_ADDRESS} unavailable: {e}") from e
+    reply = decode(line)
+    if "error" in reply:
+        raise (ServiceUnavailable if reply.get("retry") else ServiceError)(reply["error"])
+    return reply["result"]
+
+
+# === STORAGE CALLS === #
+
+def storage_stamp(path):
+    # the service resolves the file name against its own Database folder
+    return call("storage_stamp", os.path.basename(path))
+
+def load_users():
+    return call("load_users")
+
+def save_users(users):
+    call("save_users", users)
+
+def load_task_config():
+    return call("load_task_config")
+
+def save_task_config(cfg):
+    call("save_task_config", cfg)
+
+def load_employee_logs(user, since=None, until=None):
+    return call("load_employee_logs", user, since, until)
+
+def load_shifts(user, since=None, until=None):
+    return call("load_shifts", user, since, until)
+
+def log_version(user):
+    # a list after the round trip, still fine to compare
+    return call("log_version", user)
+
+def save_employee_logs(user, logs):
+    call("save_employee_logs", user, logs)
+
+def clock_in_user(user, task, location):
+    return call("clock_in_user", user, task, location)
+
+def clock_out_user(user):
+    return call("clock_out_user", user)
+
+def apply_clock_events(batch):
+    call("apply_clock_events", batch)
+
+def load_open_shifts():
+    return call("load_open_shifts")
+
+def list_employee_ids(company):
+    return call("list_employee_ids", company)
+
+def list_companies():
+    return call("list_companies")
+
+def query_shifts(company=None, location=None, since=None, until=None):
+    return call("query_shifts", company, location, since, until)
+
+def shift_fingerprint(company, since=None, until=None):
+    return call("shift_fingerprint", company, since, until)
+
+def snapshot_employee_logs(user, before=None):
+    return call("snapshot_employee_logs", user, before)
+
+def load_requests(status=None, company=None):
+    return call("load_requests", status, company)
+
+def get_request(request_id):
+    return call("get_request", request_id)
+
+def submit_request(req):
+    call("submit_request", req)
+
+def update_request(request_id, changes):
+    return call("update_request", request_id, changes)
+
+def delete_request(request_id):
+    return call("delete_request", request_id)
+
+def read_changes(cursor=None):
+    return call("read_changes", cursor)
@@ -0,0 +1,94 @@
+"""
+Snapshot job for the shift logs. Closed months are rewritten sorted,
+deduplicated and without indentation, with any journal events for them
+folded in, so a load reads a compact snapshot plus a short tail (the
+current month and the journal). See lib.utils.snapshot_employee_logs.
+
+    python -m lib.snapshot [--before 2025-07]
+
+prints the size of the logs and the time to load every history, before and
+after. The clock service runs the same job in the background, without the
+timing loads, so punches wait only for the months being rewritten.
+"""
+import argparse
+import os
+import time
+
+from lib import utils
+
+
+def _direct(fn, *args):
+    return fn(*args)
+
+
+def list_users():
+    return [{"id": eid, "company": company}
+            for company in utils.list_companies()
+            for eid in utils.list_employee_ids(company)]
+
+
+def storage_bytes():
+    """Bytes on disk taken by the shift logs (all of shifts.db for SQLite)."""
+    if utils.STORAGE_BACKEND == "sqlite":
+        paths = [utils.SQLITE_FILE, utils.SQLITE_FILE + "-wal"]
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+    total = 0
+    for root, _, files in os.walk(utils.COMPANY_FOLDER):
+        total += sum(os.path.getsize(os.path.join(root, fn))
+                     for fn in files if fn.endswith((".json", ".jsonl")))
+    return total
+
+
+def load_seconds(users, call=_direct):
+    """Seconds to load every user's full history from disk."""
+    for user in users:
+        utils._forget_cached_logs(user)  # time the parsing, not the in-memory cache
+    start = time.perf_counter()
+    for user in users:
+        call(utils.load_shifts, user)
+    return time.perf_counter() - start
+
+
+def run(before=None, call=_direct, timed=False):
+    """
+    Snapshot every user's closed months and return a report. `call(fn, *args)`
+    executes each storage call; the clock service passes one that queues it
+    on its worker thread. With `timed`, every history is also loaded before
+    and after to time it (load_before/load_after in the report).
+    """
+    users = call(list_users)
+    report = {"users": len(users), "bytes_before": storage_bytes()}
+    if timed:
+        report["load_before"] = load_seconds(users, call)
+    report["rewritten"] = sum(call(utils.snapshot_employee_logs, user, before) for user in users)
+    if utils.STORAGE_BACKEND == "sqlite":
+        from lib import sqlite_backend
+        call(sqlite_backend.vacuum)
+    report["bytes_after"] = storage_bytes()
+    if timed:
+        report["load_after"] = load_seconds(users, call)
+    return report
+
+
+def format_report(report):
+    unit = "duplicate rows dropped" if utils.STORAGE_BACKEND == "sqlite" else "months rewritten"
+    text = (f"Snapshot of {report['users']} employee logs: {report['rewritten']} {unit}\n"
+            f"  size       {report['bytes_before']:>12,} -> {report['bytes_after']:,} bytes")
+    if "load_before" in report:
+        text += f"\n  full load  {report['load_before']:>12.3f} -> {report['load_after']:.3f} s"
+    return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot the closed months of every shift log.")
+    parser.add_argument("--before", metavar="YYYY-MM",
+                        help="snapshot months before this one (default: the current month)")
+    args = parser.parse_args(argv)
+    if utils.SERVICE_ADDRESS:
+        parser.exit(1, f"SHIFT_SERVICE is set: the clock service at {utils.SERVICE_ADDRESS} "
+                       "snapshots its logs itself.\n")
+    print(format_report(run(args.before, timed=True)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+"""
+SQLite storage backend, used when SHIFT_STORAGE=sqlite.
+
+Everything the JSON files hold (users, task config, shift logs, edit
+requests) lives in a
+single database file (lib.utils.SQLITE_FILE). lib.utils keeps its public
+functions and forwards to the ones here, so the apps don't know which
+backend is active.
+
+Import existing JSON data once with:
+
+    python -m lib.sqlite_backend import
+
+The database runs in WAL mode, which needs every process using it on the
+same machine: SQLite's locks don't hold over SMB/NFS. Keep shifts.db on a
+local disk and let the other laptops reach it through the clock service
+(one writer); connect() refuses a database on a network share.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from lib import utils
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id      TEXT PRIMARY KEY,
+    name    TEXT,
+    company TEXT,
+    pin     TEXT,
+    pos     INTEGER
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shifts (
+    seq       INTEGER PRIMARY KEY AUTOINCREMENT,
+    id        TEXT,
+    user_id   TEXT NOT NULL,
+    company   TEXT NOT NULL,
+    task      TEXT,
+    location  TEXT,
+    clock_in  TEXT NOT NULL,
+    clock_out TEXT
+);
+CREATE INDEX IF NOT EXISTS shifts_user_clock_in    ON shifts(user_id, clock_in);
+CREATE INDEX IF NOT EXISTS shifts_company_location ON shifts(company, location);
+CREATE INDEX IF NOT EXISTS shifts_open             ON shifts(user_id) WHERE clock_out IS NULL;
+CREATE INDEX IF NOT EXISTS shifts_id               ON shifts(id);
+CREATE TABLE IF NOT EXISTS requests (
+    seq             INTEGER PRIMARY KEY AUTOINCREMENT,
+    id              TEXT,
+    employee        TEXT NOT NULL,
+    company         TEXT,
+    status          TEXT NOT NULL DEFAULT 'pending',
+    submitted_at    TEXT,
+    requested_start TEXT,
+    requested_end   TEXT,
+    data            TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS requests_status    ON requests(status, seq);
+CREATE INDEX IF NOT EXISTS requests_company   ON requests(company, seq);
+CREATE INDEX IF NOT EXISTS requests_submitted ON requests(submitted_at);
+CREATE TABLE IF NOT EXISTS changes (
+    seq  INTEGER PRIMARY KEY AUTOINCREMENT,
+    data TEXT NOT NULL
+);
+"""
+
+# changes for databases created by an older version of this module
+UPGRADES = [
+    ("requests", "id", "ALTER TABLE requests ADD COLUMN id TEXT"),
+]
+UPGRADE_SCRIPT = """
+UPDATE requests SET id = lower(hex(randomblob(16))) WHERE id IS NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS requests_id ON requests(id);
+"""
+
+_conn = None
+_conn_path = None
+_lock = threading.RLock()  # the connection is shared by every thread, take this around any use of it
+
+NETWORK_FILESYSTEMS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "afpfs", "9p", "fuse.sshfs"}
+
+
+class NetworkShareError(OSError):
+    """shifts.db is on a network share, where WAL mode would corrupt it."""
+
+
+def on_network_share(path):
+    """Whether path is on a UNC share, a mapped network drive or a network mount."""
+    path = os.path.abspath(path)
+    if path.startswith(("\\\\", "//")):
+        return True
+    if sys.platform == "win32":
+        import ctypes
+        drive = os.path.splitdrive(path)[0]
+        return bool(drive) and ctypes.windll.kernel32.GetDriveTypeW(drive + "\\") == 4  # DRIVE_REMOTE
+    try:
+        with open("/proc/self/mounts", encoding="utf-8") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return False
+    best, fstype = "", None
+    for mount, kind in mounts:
+        if (path == mount or path.startswith(mount.rstrip("/") + "/")) and len(mount) > len(best):
+            best, fstype = mount, kind
+    return fstype in NETWORK_FILESYSTEMS
+
+
+def connect():
+    """Shared connection for this process, created (with schema) on first use."""
+    global _conn, _conn_path
+    with _lock:
+        if _conn is None or _conn_path != utils.SQLITE_FILE:
+            if on_network_share(utils.SQLITE_FILE):
+                raise NetworkShareError(
+                    f"{utils.SQLITE_FILE} is on a network share; keep shifts.db on a local disk "
+                    "and give the other machines SHIFT_SERVICE instead (see SETUP.md)")
+            os.makedirs(os.path.dirname(utils.SQLITE_FILE), exist_ok=True)
+            _conn = sqlite3.connect(utils.SQLITE_FILE, check_same_thread=False)
+            _conn.row_factory = sqlite3.Row
+            _conn.execute("PRAGMA journal_mode=WAL")
+            _conn.execute("PRAGMA synchronous=NORMAL")
+            _conn.executescript(SCHEMA)
+            _upgrade(_conn)
+            _conn_path = utils.SQLITE_FILE
+        return _conn
+
+
+def _query(sql, args=()):
+    """All rows of a read on the shared connection."""
+    with _lock:
+        return connect().execute(sql, args).fetchall()
+
+
+def _upgrade(db):
+    for table, column, sql in UPGRADES:
+        if column not in {row["name"] for row in db.execute(f"PRAGMA table_info({table})")}:
+            db.execute(sql)
+    db.executescript(UPGRADE_SCRIPT)
+
+
+def _row_to_log(row):
+    log = {
+        "task": row["task"],
+        "location": row["location"],
+        "clock_in": row["clock_in"],
+        "clock_out": row["clock_out"]
+    }
+    if row["id"]:
+        log = {"id": row["id"], **log}
+    return log
+
+
+def _row_to_shift(row):
+    end = row["clock_out"]
+    return utils.Shift(
+        row["user_id"], row["company"], row["task"], row["location"],
+        row["clock_in"], end, utils.iso_to_minutes(row["clock_in"]),
+        utils.iso_to_minutes(end) if end else None, row["id"]
+    )
+
+
+def _insert_shift(db, user, log):
+    db.execute(
+        "INSERT INTO shifts (id, user_id, company, task, location, clock_in, clock_out)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (log.get("id"), user["id"], user["company"], log.get("task"),
+         log.get("location"), log["clock_in"], log.get("clock_out"))
+    )
+
+
+# === USERS & TASK CONFIG === #
+
+def storage_stamp(path):
+    """Changes whenever the database does (users and task config both live in it)."""
+    return (utils._file_stamp(utils.SQLITE_FILE), utils._file_stamp(utils.SQLITE_FILE + "-wal"))
+
+def load_users():
+    rows = _query("SELECT id, name, company, pin FROM users ORDER BY pos")
+    return [dict(row) for row in rows]
+
+def save_users(users):
+    db = connect()
+    with _lock, db:
+        db.execute("DELETE FROM users")
+        db.executemany(
+            "INSERT INTO users (id, name, company, pin, pos) VALUES (?, ?, ?, ?, ?)",
+            [(u["id"], u.get("name"), u.get("company"), u.get("pin"), pos)
+             for pos, u in enumerate(users)]
+        )
+
+def load_task_config():
+    rows = _query("SELECT value FROM settings WHERE key = 'task_config'")
+    return json.loads(rows[0]["value"]) if rows else {}
+
+def save_task_config(cfg):
+    db = connect()
+    with _lock, db:
+        db.execute(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES ('task_config', ?)",
+            (json.dumps(cfg, ensure_ascii=False),)
+        )
+
+
+# === SHIFT LOGS === #
+
+def _user_rows(user, since, until):
+    lo, hi = utils._day_bounds(since, until)
+    sql = "SELECT * FROM shifts WHERE user_id = ? AND company = ?"
+    args = [user["id"], user["company"]]
+    if lo:
+        sql += " AND clock_in >= ?"
+        args.append(lo)
+    if hi:
+        sql += " AND clock_in < ?"
+        args.append(hi)
+    return _query(sql + " ORDER BY seq", args)
+
+def load_employee_logs(user, since=None, until=None):
+    return [_row_to_log(row) for row in _user_rows(user, since, until)]
+
+def log_version(user):
+    """
+    Changes whenever the user's shifts do: rows are only ever inserted,
+    deleted or given a clock_out, and each of those moves the row count,
+    the highest seq or the open count. Read from the user_id indexes only
+    (a user id in another company can only cause an extra rebuild).
+    """
+    return tuple(_query(
+        "SELECT COUNT(*), MAX(seq), (SELECT COUNT(*) FROM shifts WHERE user_id = ?1 AND clock_out IS NULL)"
+        " FROM shifts WHERE user_id = ?1", (user["id"],))[0])
+
+def load_shifts(user, since=None, until=None):
+    return [_row_to_shift(row) for row in _user_rows(user, since, until)]
+
+def save_employee_logs(user, logs):
+    db = connect()
+    with _lock, db:
+        db.execute("DELETE FROM shifts WHERE user_id = ? AND company = ?",
+                   (user["id"], user["company"]))
+        for log in logs:
+            _insert_shift(db, user, log)
+
+def clock_in_user(user, task, location):
+    entry = utils.create_shift_entry(task, location)
+    db = connect()
+    with _lock, db:
+        _insert_shift(db, user, entry)
+    return entry
+
+def clock_out_user(user):
+    db = connect()
+    with _lock, db:
+        row = db.execute(
+            "SELECT * FROM shifts WHERE user_id = ? AND company = ? AND clock_out IS NULL"
+            " ORDER BY seq DESC LIMIT 1",
+            (user["id"], user["company"])
+        ).fetchone()
+        if row is None:
+            return None
+        closed = _row_to_log(row)
+        closed["clock_out"] = utils.now_trimmed()
+        db.execute("UPDATE shifts SET clock_out = ? WHERE seq = ?", (closed["clock_out"], row["seq"]))
+    return closed
+
+def apply_clock_events(batch):
+    db = connect()
+    with _lock, db:
+        for user, event in batch:
+            if event["event"] == "clock_in":
+                if db.execute("SELECT 1 FROM shifts WHERE id = ?", (event["id"],)).fetchone() is None:
+                    _insert_shift(db, user, event)
+            elif event.get("id"):
+                db.execute("UPDATE shifts SET clock_out = ? WHERE id = ? AND clock_out IS NULL",
+                           (event["clock_out"], event["id"]))
+            else:
+                db.execute("UPDATE shifts SET clock_out = ? WHERE user_id = ? AND company = ?"
+                           " AND clock_in = ? AND clock_out IS NULL",
+                           (event["clock_out"], user["id"], user["company"], event["clock_in"]))
+
+def load_open_shifts():
+    # the latest clock-in wins, as in the JSON index, should a late replay leave two open
+    rows = _query("SELECT * FROM shifts WHERE clock_out IS NULL ORDER BY clock_in, seq")
+    return {row["user_id"]: {"company": row["company"], **_row_to_log(row)} for row in rows}
+
+def list_employee_ids(company):
+    rows = _query("SELECT DISTINCT user_id FROM shifts WHERE company = ? ORDER BY user_id", (company,))
+    return [row["user_id"] for row in rows]
+
+def list_companies():
+    rows = _query("SELECT DISTINCT company FROM shifts ORDER BY company")
+    return [row["company"] for row in rows]
+
+def query_shifts(company=None, location=None, since=None, until=None):
+    lo, hi = utils._day_bounds(since, until)
+    where, args = [], []
+    if company:
+        where.append("company = ?")
+        args.append(company)
+    if location:
+        where.append("location = ?")
+        args.append(location)
+    if lo:
+        where.append("clock_in >= ?")
+        args.append(lo)
+    if hi:
+        where.append("clock_in < ?")
+        args.append(hi)
+    sql = "SELECT * FROM shifts"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY seq"
+    return [_row_to_shift(row) for row in _query(sql, args)]
+
+def shift_fingerprint(company, since=None, until=None):
+    """Hash of the company's shifts clocked in between since and until."""
+    lo, hi = utils._day_bounds(since, until)
+    sql = "SELECT id, user_id, task, location, clock_in, clock_out FROM shifts WHERE company = ?"
+    args = [company]
+    if lo:
+        sql += " AND clock_in >= ?"
+        args.append(lo)
+    if hi:
+        sql += " AND clock_in < ?"
+        args.append(hi)
+    digest = hashlib.sha1()
+    for row in _query(sql + " ORDER BY seq", args):
+        digest.update(json.dumps(tuple(row), ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+def snapshot_employee_logs(user, before=None):
+    """
+    Drop duplicate rows of the user's shifts in closed months (the rows
+    are already compact). Returns how many were dropped; vacuum() gives
+    the space back.
+    """
+    before = min(before or utils._current_month(), utils._current_month())
+    args = (user["id"], user["company"], before)
+    db = connect()
+    with _lock, db:
+        return db.execute(
+            "DELETE FROM shifts WHERE user_id = ? AND company = ? AND clock_in < ? AND seq NOT IN ("
+            " SELECT MAX(seq) FROM shifts WHERE user_id = ? AND company = ? AND clock_in < ?"
+            " GROUP BY COALESCE(id, clock_in || '|' || IFNULL(clock_out, '') || '|'"
+            " || IFNULL(task, '') || '|' || IFNULL(location, '')))",
+            args + args
+        ).rowcount
+
+def vacuum():
+    """Rebuild the database file without free pages and fold the WAL back into it."""
+    db = connect()
+    with _lock:
+        db.execute("VACUUM")
+        db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+# === SHIFT EDIT REQUESTS === #
+
+_INSERT_REQUEST = (
+    "INSERT INTO requests (id, employee, company, status, submitted_at, requested_start,"
+    " requested_end, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+def _request_args(req):
+    return (req["id"], req["employee"], req.get("company"), req.get("status", "pending").lower(),
+            req.get("submitted_at"), req.get("requested_start"), req.get("requested_end"),
+            json.dumps(req, ensure_ascii=False))
+
+def _row_to_request(row):
+    return {**json.loads(row["data"]), "id": row["id"]}
+
+def load_requests(status=None, company=None):
+    where, args = [], []
+    if status:
+        where.append("status = ?")
+        args.append(status.lower())
+    if company:
+        where.append("company = ?")
+        args.append(company)
+    sql = "SELECT id, data FROM requests"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return [_row_to_request(row) for row in _query(sql + " ORDER BY seq", args)]
+
+def get_request(request_id):
+    rows = _query("SELECT id, data FROM requests WHERE id = ?", (request_id,))
+    return _row_to_request(rows[0]) if rows else None
+
+def submit_request(req):
+    db = connect()
+    with _lock, db:
+        db.execute(_INSERT_REQUEST, _request_args(req))
+
+def update_request(request_id, changes):
+    db = connect()
+    with _lock, db:
+        row = db.execute("SELECT id, data FROM requests WHERE id = ?", (request_id,)).fetchone()
+        if row is None:
+            return None
+        req = {**_row_to_request(row), **changes, "id": request_id}
+        db.execute(
+            "UPDATE requests SET employee = ?, company = ?, status = ?, submitted_at = ?,"
+            " requested_start = ?, requested_end = ?, data = ? WHERE id = ?",
+            _request_args(req)[1:] + (request_id,)
+        )
+    return req
+
+def delete_request(request_id):
+    db = connect()
+    with _lock, db:
+        cur = db.execute("DELETE FROM requests WHERE id = ?", (request_id,))
+    return cur.rowcount > 0
+
+
+# === CHANGE FEED === #
+
+CHANGE_FEED_KEEP = 10000  # rows kept in the changes table
+
+def publish_changes(changes):
+    db = connect()
+    with _lock, db:
+        db.executemany("INSERT INTO changes (data) VALUES (?)",
+                       [(json.dumps(change, ensure_ascii=False),) for change in changes])
+        db.execute("DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?",
+                   (CHANGE_FEED_KEEP,))
+
+def read_changes(cursor=None):
+    if cursor is None:
+        return [], _query("SELECT COALESCE(MAX(seq), 0) FROM changes")[0][0]
+    first = _query("SELECT MIN(seq) FROM changes")[0][0]
+    if first is not None and first > cursor + 1:
+        # rows after the cursor were already trimmed
+        return None, _query("SELECT MAX(seq) FROM changes")[0][0]
+    rows = _query("SELECT seq, data FROM changes WHERE seq > ? ORDER BY seq", (cursor,))
+    if not rows:
+        return [], cursor
+    return [json.loads(row["data"]) for row in rows], rows[-1]["seq"]
+
+
+# === MIGRATION === #
+
+def import_json_database():
+    """Copy users, task config, every employee log and all edit requests from the JSON files."""
+    with open(utils.USER_FILE, encoding="utf-8") as f:
+        save_users(json.load(f))
+    with open(utils.TASK_FILE, encoding="utf-8") as f:
+        save_task_config(json.load(f))
+
+    # read the JSON logs directly, bypassing the backend switch
+    backend, utils.STORAGE_BACKEND = utils.STORAGE_BACKEND, "json"
+    try:
+        companies = utils.list_companies()
+        imported = 0
+        for company in companies:
+            for eid in utils.list_employee_ids(company):
+                user = {"id": eid, "company": company}
+                logs = utils.load_employee_logs(user)
+                save_employee_logs(user, logs)
+                imported += len(logs)
+        requests = utils.load_requests()
+        db = connect()
+        with _lock, db:
+            db.execute("DELETE FROM requests")
+            db.executemany(_INSERT_REQUEST, [_request_args(req) for req in requests])
+    finally:
+        utils.STORAGE_BACKEND = backend
+    print(f"Imported {imported} shifts from {len(companies)} companies"
+          f" and {len(requests)} requests into {utils.SQLITE_FILE}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["import"]:
+        import_json_database()
+    else:
+        print("usage: python -m lib.sqlite_backend import")
@@ -0,0 +1,75 @@
+from typing import Any, Dict, List, Tuple
+
+
+class TaskIndex:
+    """
+    Lookup tables compiled once from a task config
+    ({location: {company: [{"name", "completed"} or legacy "name"]}}).
+
+    Get the shared instance for the current task_config.json with
+    lib.utils.get_task_index(); it is rebuilt whenever the config changes.
+    """
+
+    def __init__(self, task_config: Dict[str, Any]):
+        # (location, company) -> ((name, completed), ...) in config order
+        self._tasks: Dict[Tuple[str, str], Tuple[Tuple[str, bool], ...]] = {}
+        self._locations_by_company: Dict[str, List[str]] = {}
+        self._pairs_by_task: Dict[str, List[Tuple[str, str]]] = {}
+        # company -> {task name: completed}; the last location listed wins,
+        # like the exporter's original scan
+        self._completed: Dict[str, Dict[str, bool]] = {}
+
+        for location, companies in task_config.items():
+            for company, items in companies.items():
+                tasks = []
+                for item in items:
+                    if isinstance(item, dict):
+                        name, done = item["name"], bool(item.get("completed", False))
+                    else:
+                        name, done = item, False  # legacy string entry
+                    tasks.append((name, done))
+                    self._pairs_by_task.setdefault(name, []).append((location, company))
+                    self._completed.setdefault(company, {})[name] = done
+                self._tasks[(location, company)] = tuple(tasks)
+                self._locations_by_company.setdefault(company, []).append(location)
+
+        self.locations: List[str] = sorted(task_config)
+        self.companies: List[str] = sorted(self._locations_by_company)
+        self.task_names: List[str] = sorted(self._pairs_by_task)
+        self._filter_cache: Dict[Tuple[str, str], Tuple[List[str], List[str], List[str]]] = {}
+
+    def tasks_for(self, location: str, company: str) -> List[str]:
+        """All task names for a company at a location, completed or not."""
+        return [name for name, _ in self._tasks.get((location, company), ())]
+
+    def incomplete_tasks(self, location: str, company: str) -> List[str]:
+        return [name for name, done in self._tasks.get((location, company), ()) if not done]
+
+    def locations_for_company(self, company: str) -> List[str]:
+        return list(self._locations_by_company.get(company, ()))
+
+    def pairs_for_task(self, task: str) -> List[Tuple[str, str]]:
+        """Every (location, company) that has a task with this name."""
+        return list(self._pairs_by_task.get(task, ()))
+
+    def completion_for_company(self, company: str) -> Dict[str, bool]:
+        return dict(self._completed.get(company, {}))
+
+    def filter_options(self, location: str = "Any", company: str = "Any"):
+        """
+        Sorted (locations, companies, tasks) for the Shift Viewer dropdowns,
+        narrowed to the chosen location/company ("Any" means no filter).
+        """
+        key = (location, company)
+        if key not in self._filter_cache:
+            locations, companies, tasks = set(), set(), set()
+            for (loc, comp), items in self._tasks.items():
+                if location != "Any" and loc != location:
+                    continue
+                if company != "Any" and comp != company:
+                    continue
+                locations.add(loc)
+                companies.add(comp)
+                tasks.update(name for name, _ in items)
+            self._filter_cache[key] = (sorted(locations), sorted(companies), sorted(tasks))
+        return self._filter_cache[key]
@@ -1,9 +1,19 @@
+import atexit
 import json
 import os
 import sys
-from datetime import datetime
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, NamedTuple, Optional
+
+from lib.filelock import FileLock
+from lib.intervals import IntervalIndex
+from lib.request_store import RequestStore
+from lib.task_index import TaskIndex
+from lib.write_behind import WriteBehindQueue
 
 def resource_path(relative_path):
     base_path = getattr(
@@ -14,83 +24,211 @@ def resource_path(relative_path):
 
 
 # === CONFIGURATIONS === #
-COMPANY_FOLDER = resource_path("Database/Fyrirtaeki")
-USER_FILE      = resource_path("Database/users.json")
-EXPORT_FOLDER  = resource_path("Database/reports")
-TASK_FILE      = resource_path("Database/task_config.json")
+# SHIFT_DATABASE points the apps at another Database folder,
+# SHIFT_STORAGE picks the storage backend: "json" (default) or "sqlite",
+# SHIFT_SERVICE ("host:port") sends everything to a running clock service
+# instead (apps/clock_service.py), which then owns the storage;
+# SHIFT_SERVICE_TOKEN is the shared secret the service and its clients use.
+DATABASE_FOLDER = os.environ.get("SHIFT_DATABASE") or resource_path("Database")
+COMPANY_FOLDER  = os.path.join(DATABASE_FOLDER, "Fyrirtaeki")
+USER_FILE       = os.path.join(DATABASE_FOLDER, "users.json")
+EXPORT_FOLDER   = os.path.join(DATABASE_FOLDER, "reports")
+TASK_FILE       = os.path.join(DATABASE_FOLDER, "task_config.json")
+SQLITE_FILE     = os.path.join(DATABASE_FOLDER, "shifts.db")
+OPEN_SHIFTS_FILE = os.path.join(DATABASE_FOLDER, "open_shifts.json")
+REQUESTS_FOLDER = os.path.join(DATABASE_FOLDER, "requests")
+REQUESTS_FILE   = os.path.join(REQUESTS_FOLDER, "requests.jsonl")
+CHANGES_FILE    = os.path.join(DATABASE_FOLDER, "changes.jsonl")
+STORAGE_BACKEND = os.environ.get("SHIFT_STORAGE", "json").lower()
+SERVICE_ADDRESS = os.environ.get("SHIFT_SERVICE") or None
+SERVICE_TOKEN   = os.environ.get("SHIFT_SERVICE_TOKEN") or None
+
+
+_store_lock_file = None
+
+def _store_lock():
+    """
+    Lock held by whoever changes the shared JSON files that are read,
+    modified and written back (journals, open_shifts.json), so terminals
+    sharing the Database folder don't undo each other's writes.
+    """
+    global _store_lock_file
+    path = os.path.join(DATABASE_FOLDER, "store.lock")
+    if _store_lock_file is None or _store_lock_file.path != path:
+        _store_lock_file = FileLock(path)
+    return _store_lock_file
+
+
+def _backend():
+    """
+    Return the module that stores data for SERVICE_ADDRESS/STORAGE_BACKEND,
+    or None when the plain JSON files under DATABASE_FOLDER are used.
+    """
+    if SERVICE_ADDRESS:
+        from lib import service_client
+        return service_client
+    if STORAGE_BACKEND == "sqlite":
+        from lib import sqlite_backend
+        return sqlite_backend
+    return None
 
 
 # === USER MANAGEMENT === #
 
-def load_users() -> List[Dict[str,Any]]:
-    with open(USER_FILE, encoding="utf-8") as f:
+def load_users(filename=None) -> List[Dict[str,Any]]:
+    if filename is None:
+        backend = _backend()
+        if backend:
+            return backend.load_users()
+        filename = USER_FILE
+    with open(filename, 'r', encoding='utf-8') as f:
         return json.load(f)
 
 def save_users(users: List[Dict[str,Any]]) -> None:
-    with open(USER_FILE, "w", encoding="utf-8") as f:
-        json.dump(users, f, indent=2, ensure_ascii=False)
+    backend = _backend()
+    if backend:
+        backend.save_users(users)
+    else:
+        with open(USER_FILE, "w", encoding="utf-8") as f:
+            json.dump(users, f, indent=2, ensure_ascii=False)
+    invalidate_cache("users")
 
-def load_task_config() -> Dict[str,Any]:
-    with open(TASK_FILE, encoding="utf-8") as f:
+def load_task_config(filename=TASK_FILE) -> Dict[str,Any]:
+    backend = _backend()
+    if backend and filename == TASK_FILE:
+        return backend.load_task_config()
+    with open(filename, "r", encoding="utf-8") as f:
         return json.load(f)
 
 def save_task_config(cfg: Dict[str,Any]) -> None:
-    with open(TASK_FILE, "w", encoding="utf-8") as f:
-        json.dump(cfg, f, indent=2, ensure_ascii=False)
+    backend = _backend()
+    if backend:
+        backend.save_task_config(cfg)
+    else:
+        with open(TASK_FILE, "w", encoding="utf-8") as f:
+            json.dump(cfg, f, indent=2, ensure_ascii=False)
+    invalidate_cache("task_config")
 
 
-# legacy override/alternate loader (debug)
-def load_users(filename=None):
-    if filename is None:
-        filename = resource_path(os.path.join('Database','users.json'))
-    print(f"Loading users from: {filename}")
-    with open(filename, 'r', encoding='utf-8') as f:
-        return json.load(f)
+# === CONFIG CACHE === #
+# Read-only callers share one parsed copy of users / task config. It is
+# re-parsed only when the file's (mtime, size) changes, or when
+# save_users/save_task_config invalidate it (mtime can be too coarse on
+# network drives to notice two saves in the same second).
+# load_users/load_task_config still return fresh, editable copies.
+
+_cache = {}  # name -> (stamp, snapshot)
+
+class _FrozenDict(dict):
+    """A dict that refuses in-place changes (still a dict for isinstance/json)."""
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("cached snapshot is read-only, use load_users/load_task_config to edit")
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+def _freeze(obj):
+    if isinstance(obj, dict):
+        return _FrozenDict((k, _freeze(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return tuple(_freeze(v) for v in obj)
+    return obj
+
+def _cached(name, stamp, load):
+    entry = _cache.get(name)
+    if entry is None or entry[0] != stamp:
+        # stamp is taken before loading, so a write racing the load just
+        # causes one extra re-parse next time
+        entry = (stamp, _freeze(load()))
+        _cache[name] = entry
+    return entry[1]
+
+def invalidate_cache(name=None):
+    if name is None:
+        _cache.clear()
+    else:
+        _cache.pop(name, None)
+
+def _file_stamp(path):
+    """(mtime, size) of a file, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _storage_stamp(path):
+    backend = _backend()
+    if backend:
+        return backend.storage_stamp(path)
+    return _file_stamp(path)
+
+def get_users_snapshot():
+    """Read-only tuple of users, shared between callers."""
+    return _cached("users", _storage_stamp(USER_FILE), load_users)
+
+def get_task_config_snapshot():
+    """Read-only task config, shared between callers."""
+    return _cached("task_config", _storage_stamp(TASK_FILE), load_task_config)
+
+# PIN -> user, rebuilt whenever the users snapshot is replaced
+_pin_index = {}
+_pin_index_source = None
+
+def _get_pin_index():
+    global _pin_index, _pin_index_source
+    users = get_users_snapshot()
+    if users is not _pin_index_source:
+        index = {}
+        for user in users:
+            # first user wins on a duplicate PIN, same as the old linear scan
+            index.setdefault(str(user.get("pin")), user)
+        _pin_index, _pin_index_source = index, users
+    return _pin_index
 
 def get_user_by_pin(pin, users=None):
-    if users is None:
-        users = load_users()
-    for user in users:
-        if str(user.get("pin")) == str(pin):
-            return user
-    return None
+    if users is not None:
+        for user in users:
+            if str(user.get("pin")) == str(pin):
+                return user
+        return None
+    return _get_pin_index().get(str(pin))
 
 def is_clocked_in(user):
-    logs = load_employee_logs(user)
-    return bool(logs and logs[-1].get("clock_out") is None)
+    return user["id"] in load_open_shifts()
 
 
 # === TASK MANAGEMENT === #
 
-def load_task_config(filename=TASK_FILE) -> Dict[str,Any]:
-    with open(filename, "r", encoding="utf-8") as f:
-        return json.load(f)
+_task_index = None
+_task_index_source = None
+
+def get_task_index() -> TaskIndex:
+    """Compiled lookups for the current task config, rebuilt when it changes."""
+    global _task_index, _task_index_source
+    cfg = get_task_config_snapshot()
+    if cfg is not _task_index_source:
+        _task_index, _task_index_source = TaskIndex(cfg), cfg
+    return _task_index
+
+def _task_index_for(task_config):
+    if task_config is None or task_config is _task_index_source:
+        return get_task_index()
+    return TaskIndex(task_config)
 
 def get_locations_for_user(user: Dict[str,Any],
-                           task_config: Dict[str,Any]
+                           task_config: Dict[str,Any] = None
                            ) -> List[str]:
-    return [
-        location
-        for location, companies in task_config.items()
-        if user["company"] in companies
-    ]
+    return _task_index_for(task_config).locations_for_company(user["company"])
 
 def get_tasks_for_user(user: Dict[str,Any],
                        location: str,
-                       task_config: Dict[str,Any]
+                       task_config: Dict[str,Any] = None
                        ) -> List[str]:
     """
     Return all task-names for this user's company at this location,
     whether completed or not (handles legacy string lists too).
     """
-    raw = task_config.get(location, {}).get(user["company"], [])
-    names: List[str] = []
-    for item in raw:
-        if isinstance(item, dict):
-            names.append(item["name"])
-        else:
-            names.append(item)
-    return names
+    return _task_index_for(task_config).tasks_for(location, user["company"])
 
 def get_incomplete_tasks(task_config: Dict[str,Any],
                          company: str,
@@ -100,38 +238,635 @@ def get_incomplete_tasks(task_config: Dict[str,Any],
     Return only those task-names whose `completed` flag is False.
     Falls back to treating all legacy strings as incomplete.
     """
-    raw = task_config.get(location, {}).get(company, [])
-    names: List[str] = []
-    for item in raw:
-        if isinstance(item, dict):
-            if not item.get("completed", False):
-                names.append(item["name"])
-        else:
-            names.append(item)
-    return names
+    return _task_index_for(task_config).incomplete_tasks(location, company)
 
 
 # === FILE PATHS & LOG HANDLING === #
 
+# Each employee's shifts are stored in month partitions keyed by clock-in:
+#   {company}/{id}/2025-07.json, {company}/{id}/2025-08.json, ...
+# Clock events are appended to {company}/{id}/journal.jsonl and folded into
+# the partitions they belong to once the journal grows past this size.
+# Older installs have one {company}/{id}.json (+ {id}.jsonl); those are read
+# as-is and converted the first time they are saved, or all at once with
+# `python -m lib.migrate partitions`.
+# Months before the current one are closed: their partitions are the
+# snapshot, written sorted, deduplicated and without indentation (see
+# snapshot_employee_logs); the current month and the journal are the tail.
+JOURNAL_COMPACT_BYTES = 64 * 1024
+COMPACT_JSON = {"separators": (",", ":"), "ensure_ascii": False}
+
+def get_employee_log_dir(user):
+    return os.path.join(COMPANY_FOLDER, user["company"], user["id"])
+
 def get_employee_log_path(user):
+    """Path of the old single-file log ({company}/{id}.json)."""
     folder = os.path.join(COMPANY_FOLDER, user["company"])
     os.makedirs(folder, exist_ok=True)
     return os.path.join(folder, f"{user['id']}.json")
 
-def load_employee_logs(user):
-    path = get_employee_log_path(user)
-    if not os.path.exists(path):
+def _is_legacy_log(user):
+    return (not os.path.isdir(get_employee_log_dir(user))
+            and (os.path.exists(get_employee_log_path(user))
+                 or os.path.exists(_legacy_journal_path(user))))
+
+def _legacy_journal_path(user):
+    return os.path.join(COMPANY_FOLDER, user["company"], f"{user['id']}.jsonl")
+
+def get_employee_journal_path(user):
+    if _is_legacy_log(user):
+        return _legacy_journal_path(user)
+    return os.path.join(get_employee_log_dir(user), "journal.jsonl")
+
+def _partition_key(iso):
+    return iso[:7]  # "YYYY-MM"
+
+def list_log_partitions(user, since=None, until=None):
+    """
+    Month keys of the user's partitions, oldest first, skipping months
+    entirely outside [since, until].
+    """
+    folder = get_employee_log_dir(user)
+    if not os.path.isdir(folder):
         return []
+    lo = since.isoformat()[:7] if since else None
+    hi = until.isoformat()[:7] if until else None
+    keys = []
+    for fn in os.listdir(folder):
+        if not fn.endswith(".json"):
+            continue
+        key = fn[:-5]
+        if lo and key < lo or hi and key > hi:
+            continue
+        keys.append(key)
+    return sorted(keys)
+
+def _partition_path(user, key):
+    return os.path.join(get_employee_log_dir(user), f"{key}.json")
+
+class Shift(NamedTuple):
+    """A stored shift with its times pre-parsed to epoch minutes."""
+    user_id: str
+    company: str
+    task: str
+    location: str
+    clock_in: str
+    clock_out: Optional[str]
+    start: int            # epoch minutes
+    end: Optional[int]    # None while the shift is open
+    id: Optional[str] = None
+
+def _log_entry(log):
+    """(log, start, end) with the times parsed to epoch minutes."""
+    end = log.get("clock_out")
+    return (log, iso_to_minutes(log["clock_in"]), iso_to_minutes(end) if end else None)
+
+# path -> ((mtime, size), [(log, start, end), ...]); a file is parsed once
+# and re-read only when it changes on disk or is rewritten here
+_log_file_cache = {}
+
+def _read_log_file(path, cache=True):
+    stamp = _file_stamp(path)
+    cached = _log_file_cache.get(path)
+    if cached is None or cached[0] != stamp:
+        with open(path, "r", encoding="utf-8") as f:
+            entries = [_log_entry(log) for log in json.load(f)]
+        cached = (stamp, entries)
+        if cache:
+            _log_file_cache[path] = cached
+    return cached[1]
+
+def _forget_cached_logs(user):
+    """Drop the parsed log files and the interval index cached for one user."""
+    folder = get_employee_log_dir(user) + os.sep
+    legacy = os.path.join(COMPANY_FOLDER, user["company"], f"{user['id']}.json")
+    for path in [path for path in _log_file_cache if path.startswith(folder) or path == legacy]:
+        del _log_file_cache[path]
+    _interval_cache.pop((user["company"], user["id"]), None)
+
+def _read_partition(user, key):
+    """Fresh, editable copies of the shifts in one month partition."""
+    return [dict(log) for log, _, _ in _read_log_file(_partition_path(user, key))]
+
+def _write_json_atomic(path, data, **dump_kwargs):
+    """Write to a temp file and swap it in, so a crash never leaves half a file."""
+    # a temp name of its own, so two writers never swap in each other's file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _log_file_cache.pop(path, None)
+
+def _append_journal(path, *events):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(event, ensure_ascii=False) + "\n" for event in events))
+        f.flush()
+        os.fsync(f.fileno())
+
+def _replay_journal(logs, path):
+    """
+    Apply journal events on top of the snapshot. Events are keyed by shift
+    id, so replaying a journal that was already folded into the snapshot
+    (crash during compaction) changes nothing.
+    """
+    if not os.path.exists(path):
+        return logs
+    by_id = {log["id"]: log for log in logs if log.get("id")}
     with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                # torn last line from a crash mid-append
+                continue
+            if event.get("event") == "clock_in":
+                if event["id"] in by_id:
+                    continue
+                entry = {k: v for k, v in event.items() if k != "event"}
+                logs.append(entry)
+                by_id[entry["id"]] = entry
+            elif event.get("event") == "clock_out":
+                if event.get("id"):
+                    entry = by_id.get(event["id"])
+                else:
+                    # shift opened before journaling, it has no id yet
+                    entry = next((l for l in logs if l.get("clock_in") == event["clock_in"]
+                                  and l.get("clock_out") is None), None)
+                if entry is not None and entry.get("clock_out") is None:
+                    entry["clock_out"] = event["clock_out"]
+    return logs
+
+def _load_log_entries(user, since=None, until=None, cache=True):
+    """
+    (log, start, end) for the user's shifts clocked in between since and
+    until. With cache=False the files parsed aren't kept in memory.
+    """
+    flush_writes()
+    entries = []
+    if _is_legacy_log(user):
+        path = get_employee_log_path(user)
+        if os.path.exists(path):
+            entries = _read_log_file(path, cache)
+    else:
+        for key in list_log_partitions(user, since, until):
+            entries.extend(_read_log_file(_partition_path(user, key), cache))
+    journal = get_employee_journal_path(user)
+    if os.path.exists(journal):
+        logs = _replay_journal([dict(log) for log, _, _ in entries], journal)
+        entries = [_log_entry(log) for log in logs]
+    if since or until:
+        lo = date_to_minutes(since) if since else None
+        hi = date_to_minutes(until + timedelta(days=1)) if until else None
+        entries = [e for e in entries
+                   if not (lo is not None and e[1] < lo or hi is not None and e[1] >= hi)]
+    return entries
+
+def load_employee_logs(user, since=None, until=None):
+    """
+    The user's shifts, optionally only those clocked in between since and
+    until (datetime.date, inclusive). Only the month partitions overlapping
+    that range are opened.
+    """
+    backend = _backend()
+    if backend:
+        return backend.load_employee_logs(user, since, until)
+    return [dict(log) for log, _, _ in _load_log_entries(user, since, until)]
+
+def load_shifts(user, since=None, until=None):
+    """Like load_employee_logs, but as read-only Shift records."""
+    backend = _backend()
+    if backend:
+        return backend.load_shifts(user, since, until)
+    return _to_shifts(user, _load_log_entries(user, since, until))
+
+def _to_shifts(user, entries):
+    return [
+        Shift(user["id"], user["company"], log.get("task"), log.get("location"),
+              log["clock_in"], log.get("clock_out"), start, end, log.get("id"))
+        for log, start, end in entries
+    ]
+
+def _current_month():
+    return _partition_key(now_trimmed())
+
+def _snapshot_logs(logs):
+    """Sorted by clock-in, keeping the last copy of any shift stored twice."""
+    unique = {}
+    for log in logs:
+        key = log.get("id") or (log["clock_in"], log.get("clock_out"), log.get("task"), log.get("location"))
+        unique[key] = log
+    return sorted(unique.values(), key=lambda log: log["clock_in"])
+
+def _write_partitions(user, logs, keys=None):
+    """
+    Write logs into their month partitions. With keys, only those months
+    are (re)written; otherwise partitions with no shifts left are removed.
+    Closed months are written in snapshot form.
+    """
+    folder = get_employee_log_dir(user)
+    os.makedirs(folder, exist_ok=True)
+    months = {}
+    for log in logs:
+        months.setdefault(_partition_key(log["clock_in"]), []).append(log)
+    current = _current_month()
+    for key, entries in months.items():
+        if keys is None or key in keys:
+            if key < current:
+                _write_json_atomic(_partition_path(user, key), _snapshot_logs(entries), **COMPACT_JSON)
+            else:
+                _write_json_atomic(_partition_path(user, key), entries, indent=4)
+    for key in list_log_partitions(user):
+        if key not in months and (keys is None or key in keys):
+            os.remove(_partition_path(user, key))
+
+def _remove_legacy_log(user):
+    for path in (get_employee_log_path(user), _legacy_journal_path(user)):
+        if os.path.exists(path):
+            os.remove(path)
 
 def save_employee_logs(user, logs):
-    path = get_employee_log_path(user)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(logs, f, indent=4)
+    """Write the full history into month partitions and drop the journal."""
+    # the service publishes the changes itself
+    old = None if SERVICE_ADDRESS else load_employee_logs(user)
+    backend = _backend()
+    if backend:
+        backend.save_employee_logs(user, logs)
+    else:
+        flush_writes()
+        with _store_lock():
+            _write_partitions(user, logs)
+            journal = os.path.join(get_employee_log_dir(user), "journal.jsonl")
+            if os.path.exists(journal):
+                os.remove(journal)
+            _remove_legacy_log(user)
+            _set_open_shift(user, _last_open_shift(logs))
+    if old is not None:
+        publish_changes(_shift_changes(user, old, logs))
+
+def _same_shift(log, shift):
+    if shift.id:
+        return log.get("id") == shift.id
+    return (log.get("clock_in"), log.get("clock_out"), log.get("task"), log.get("location")) == \
+        (shift.clock_in, shift.clock_out, shift.task, shift.location)
+
+def replace_employee_shifts(user, remove, add):
+    """
+    Drop the Shift records in `remove` and append the logs in `add`. Only
+    the month partitions holding those shifts are rewritten.
+    """
+    backend = _backend()
+    if backend or _is_legacy_log(user):
+        logs = [log for log in load_employee_logs(user)
+                if not any(_same_shift(log, shift) for shift in remove)]
+        save_employee_logs(user, logs + list(add))
+        return
+    flush_writes()
+    with _store_lock():
+        compact_employee_logs(user)
+        keys = {_partition_key(shift.clock_in) for shift in remove}
+        keys |= {_partition_key(log["clock_in"]) for log in add}
+        logs = []
+        for key in keys & set(list_log_partitions(user)):
+            logs.extend(log for log in _read_partition(user, key)
+                        if not any(_same_shift(log, shift) for shift in remove))
+        _write_partitions(user, logs + list(add), keys)
+    publish_changes(
+        [_shift_change("shift_deleted", user, shift_to_log(shift)) for shift in remove] +
+        [_shift_change("shift_created", user, log) for log in add]
+    )
+
+def _log_version(user):
+    """Changes whenever any of the user's log files (or rows in a backend) change."""
+    backend = _backend()
+    if backend:
+        return backend.log_version(user)
+    if _is_legacy_log(user):
+        paths = [get_employee_log_path(user), _legacy_journal_path(user)]
+    else:
+        folder = get_employee_log_dir(user)
+        paths = [os.path.join(folder, fn) for fn in sorted(os.listdir(folder))] \
+            if os.path.isdir(folder) else []
+    return tuple((path, _file_stamp(path)) for path in paths)
+
+def shift_fingerprint(company, since=None, until=None):
+    """
+    Changes whenever a shift of this company clocked in between since and
+    until may have changed: (file, mtime, size) of every log file that can
+    hold one. Used to tell whether a report needs rebuilding.
+    """
+    backend = _backend()
+    if backend:
+        return backend.shift_fingerprint(company, since, until)
+    flush_writes()
+    stamps = []
+    for eid in list_employee_ids(company):
+        user = {"id": eid, "company": company}
+        if _is_legacy_log(user):
+            paths = [get_employee_log_path(user), _legacy_journal_path(user)]
+        else:
+            paths = [_partition_path(user, key) for key in list_log_partitions(user, since, until)]
+            paths.append(get_employee_journal_path(user))
+        stamps.extend([os.path.relpath(path, COMPANY_FOLDER), _file_stamp(path)] for path in paths)
+    return stamps
+
+# (company, id) -> (log version, IntervalIndex of closed shifts)
+_interval_cache = {}
+
+def get_shift_interval_index(user):
+    """IntervalIndex over the user's closed shifts (Shift records), cached per log version."""
+    key = (user["company"], user["id"])
+    version = _log_version(user)
+    cached = _interval_cache.get(key)
+    if cached is None or version is None or cached[0] != version:
+        index = IntervalIndex(
+            (shift.start, shift.end, shift)
+            for shift in load_shifts(user) if shift.end is not None
+        )
+        cached = (version, index)
+        _interval_cache[key] = cached
+    return cached[1]
+
+def _read_journal_months(path):
+    """Month keys touched by the events in a journal."""
+    keys = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                keys.add(_partition_key(json.loads(line)["clock_in"]))
+            except (json.JSONDecodeError, KeyError):
+                continue
+    return keys
+
+def compact_employee_logs(user):
+    """Fold the journal into the partitions it touches (or convert an old single-file log)."""
+    if _backend():
+        return  # the backends keep no journal
+    flush_writes()
+    with _store_lock():
+        if _is_legacy_log(user):
+            logs = load_employee_logs(user)
+            _write_partitions(user, logs)
+            _remove_legacy_log(user)
+            return
+        journal = get_employee_journal_path(user)
+        if not os.path.exists(journal):
+            return
+        keys = _read_journal_months(journal)
+        logs = []
+        for key in keys & set(list_log_partitions(user)):
+            logs.extend(_read_partition(user, key))
+        logs = _replay_journal(logs, journal)
+        _write_partitions(user, logs, keys)
+        os.remove(journal)
+
+def _is_snapshot(path):
+    """Whether a partition file is already in snapshot form (no indentation)."""
+    with open(path, "rb") as f:
+        return f.read(2) != b"[\n"
+
+def snapshot_employee_logs(user, before=None):
+    """
+    Rewrite the user's closed months (those before `before`, "YYYY-MM",
+    default the current month) as sorted, deduplicated, unindented JSON,
+    folding in any journal events that belong to them. Months already in
+    snapshot form are left alone. Returns how many months were rewritten.
+    """
+    backend = _backend()
+    if backend:
+        return backend.snapshot_employee_logs(user, before)
+    flush_writes()
+    before = min(before or _current_month(), _current_month())
+    with _store_lock():
+        if _is_legacy_log(user):
+            compact_employee_logs(user)
+        journal = get_employee_journal_path(user)
+        if os.path.exists(journal) and min(_read_journal_months(journal), default=before) < before:
+            compact_employee_logs(user)
+        keys = {key for key in list_log_partitions(user)
+                if key < before and not _is_snapshot(_partition_path(user, key))}
+        if keys:
+            logs = []
+            for key in keys:
+                logs.extend(_read_partition(user, key))
+            _write_partitions(user, logs, keys)
+            _forget_cached_logs(user)
+    return len(keys)
+
+def _maybe_compact(user):
+    journal = get_employee_journal_path(user)
+    if os.path.exists(journal) and os.path.getsize(journal) > JOURNAL_COMPACT_BYTES:
+        compact_employee_logs(user)
+
+def migrate_employee_logs():
+    """Convert every old {company}/{id}.json log into month partitions."""
+    if _backend():
+        return 0  # only the JSON files have old logs to convert
+    migrated = 0
+    for company in list_companies():
+        for eid in list_employee_ids(company):
+            user = {"id": eid, "company": company}
+            if _is_legacy_log(user):
+                compact_employee_logs(user)
+                migrated += 1
+    return migrated
+
+def clock_in_user(user, task, location):
+    """Start a shift by appending one event to the user's journal."""
+    backend = _backend()
+    if backend:
+        entry = backend.clock_in_user(user, task, location)
+        publish_changes([_shift_change("shift_opened", user, entry)])
+        return entry
+    entry = create_shift_entry(task, location)
+    _record_clock_event(user, {"event": "clock_in", **entry})
+    return entry
+
+def clock_out_user(user):
+    """Close the user's open shift by appending one event. Returns the closed shift or None."""
+    backend = _backend()
+    if backend:
+        closed = backend.clock_out_user(user)
+        if closed is not None:
+            publish_changes([_shift_change("shift_closed", user, closed)])
+        return closed
+    closed = load_open_shifts().get(user["id"])
+    if closed is None:
+        return None
+    closed = {k: v for k, v in closed.items() if k != "company"}
+    closed["clock_out"] = now_trimmed()
+    _record_clock_event(user, {
+        "event": "clock_out",
+        "id": closed.get("id"),
+        "clock_in": closed["clock_in"],
+        "clock_out": closed["clock_out"]
+    })
+    return closed
+
+def list_employee_ids(company):
+    """Ids of every employee with a log in this company."""
+    backend = _backend()
+    if backend:
+        return backend.list_employee_ids(company)
+    folder = os.path.join(COMPANY_FOLDER, company)
+    if not os.path.isdir(folder):
+        return []
+    return sorted({
+        os.path.splitext(fn)[0] for fn in os.listdir(folder)
+        if fn.endswith((".json", ".jsonl")) or os.path.isdir(os.path.join(folder, fn))
+    })
+
+def list_companies():
+    backend = _backend()
+    if backend:
+        return backend.list_companies()
+    if not os.path.isdir(COMPANY_FOLDER):
+        return []
+    return sorted(name for name in os.listdir(COMPANY_FOLDER)
+                  if os.path.isdir(os.path.join(COMPANY_FOLDER, name)))
+
+def _day_bounds(since=None, until=None):
+    """
+    ISO-string bounds for clock_in: [since, until+1 day). Plain string
+    comparison works for both "2025-07-07T08:00" and "2025-07-07 08:00".
+    """
+    lo = since.isoformat() if since else None
+    hi = (until + timedelta(days=1)).isoformat() if until else None
+    return lo, hi
+
+def query_shifts(company=None, location=None, since=None, until=None):
+    """
+    Return Shift records, optionally limited to one company/location and to
+    clock-in dates between since and until (datetime.date, inclusive).
+    """
+    backend = _backend()
+    if backend:
+        return backend.query_shifts(company, location, since, until)
+    return list(_iter_shifts(company, location, since, until, cache=True))
+
+def iter_shifts(company=None, location=None, since=None, until=None):
+    """
+    Like query_shifts, but yields the shifts one employee log at a time and
+    keeps none of them cached, so only one log is in memory however many
+    shifts there are.
+    """
+    return _iter_shifts(company, location, since, until, cache=False)
+
+def _iter_shifts(company, location, since, until, cache):
+    backend = _backend()
+    companies = [company] if company else list_companies()
+    for comp in companies:
+        for eid in list_employee_ids(comp):
+            user = {"id": eid, "company": comp}
+            if backend:
+                shifts = backend.load_shifts(user, since, until)
+            else:
+                shifts = _to_shifts(user, _load_log_entries(user, since, until, cache))
+            for shift in shifts:
+                if location and shift.location != location:
+                    continue
+                yield shift
+
+# === OPEN SHIFT INDEX === #
+# open_shifts.json maps user id -> the shift they are clocked in on (plus
+# "company"), so login status and the Control Board never read histories.
+
+def load_open_shifts():
+    backend = _backend()
+    if backend:
+        return backend.load_open_shifts()
+    # take the queue first: a batch committed in between is then just applied twice
+    pending = _write_queue.pending() if _write_queue else []
+    index = _read_open_shifts()
+    for user, event in pending:
+        _apply_open_event(index, user, event)
+    return index
+
+def _read_open_shifts():
+    try:
+        with open(OPEN_SHIFTS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return rebuild_open_shifts()
+    except ValueError:
+        print("[WARN] open_shifts.json is unreadable, rebuilding it from the logs")
+        return rebuild_open_shifts()
+
+def _save_open_shifts(index):
+    os.makedirs(DATABASE_FOLDER, exist_ok=True)
+    _write_json_atomic(OPEN_SHIFTS_FILE, index, indent=2, ensure_ascii=False)
+
+def _set_open_shift(user, shift):
+    """Record (or with shift=None, clear) the user's open shift in the index."""
+    with _store_lock():
+        index = _read_open_shifts()
+        if shift is None:
+            if index.pop(user["id"], None) is None:
+                return
+        else:
+            index[user["id"]] = {"company": user["company"], **shift}
+        _save_open_shifts(index)
+
+def _apply_open_event(index, user, event, closed=()):
+    """
+    Apply one clock event to the index. Events can arrive late (an offline
+    terminal's outbox) or twice, so a clock-in only counts if its shift
+    isn't in `closed` (ids of shifts already closed in the logs) and is
+    later than the open one, and a clock-out only closes its own shift.
+    """
+    current = index.get(user["id"])
+    if event["event"] == "clock_in":
+        if event.get("id") in closed:
+            return
+        if current and not _same_open_shift(current, event) and current["clock_in"] >= event["clock_in"]:
+            return
+        index[user["id"]] = {"company": user["company"],
+                             **{k: v for k, v in event.items() if k != "event"}}
+    elif current and _same_open_shift(current, event):
+        del index[user["id"]]
+
+def _same_open_shift(shift, event):
+    if shift.get("id") and event.get("id"):
+        return shift["id"] == event["id"]
+    return shift["clock_in"] == event["clock_in"]  # shifts opened before they had ids
+
+def _closed_shift_ids(batch):
+    """Ids of the clock-ins in batch whose shift is already closed in the logs."""
+    closed = set()
+    for user, event in batch:
+        if event["event"] == "clock_in" and event.get("id"):
+            day = datetime.fromisoformat(event["clock_in"]).date()
+            closed.update(log["id"] for log in load_employee_logs(user, since=day, until=day)
+                          if log.get("id") == event["id"] and log.get("clock_out"))
+    return closed
+
+def _last_open_shift(logs):
+    return next((log for log in reversed(logs) if log.get("clock_out") is None), None)
+
+def rebuild_open_shifts():
+    """Scan every employee log once and rewrite the index from scratch."""
+    with _store_lock():
+        index = {}
+        for company in list_companies():
+            for eid in list_employee_ids(company):
+                shift = _last_open_shift(load_employee_logs({"id": eid, "company": company}))
+                if shift is not None:
+                    index[eid] = {"company": company, **shift}
+        _save_open_shifts(index)
+    return index
 
 def create_shift_entry(task, location):
     return {
+        "id": uuid.uuid4().hex,
         "task": task,
         "location": location,
         "clock_in": now_trimmed(),
@@ -146,7 +881,370 @@ def close_last_shift(logs):
     return None
 
 
+# === WRITE-BEHIND CLOCK EVENTS === #
+# At shift change dozens of punches land within a couple of minutes. With
+# write-behind enabled (the clock service does this), clock_in_user and
+# clock_out_user return as soon as the event is queued; a background thread
+# commits everything that arrived within WRITE_BEHIND_WINDOW seconds with
+# one fsynced append per journal and one open_shifts.json write. Queued
+# events show up in load_open_shifts() straight away, anything that reads
+# shift logs flushes the queue first, and the queue is flushed on exit.
+
+WRITE_BEHIND_WINDOW = 0.2
+_write_queue = None
+
+def enable_write_behind(window=WRITE_BEHIND_WINDOW):
+    """Queue clock events instead of writing them synchronously (JSON backend only)."""
+    global _write_queue
+    if _write_queue is None and _backend() is None:
+        _write_queue = WriteBehindQueue(_commit_clock_events, window)
+        atexit.register(flush_writes)
+    return _write_queue
+
+def flush_writes():
+    """Commit any queued clock events now."""
+    # not while holding the store lock: the write-behind thread may be
+    # waiting for it mid-commit. The queued events then land in the journal
+    # right after, which replays them on top of whatever is written now.
+    if _write_queue and not _store_lock().held():
+        _write_queue.flush()
+
+def apply_clock_events(batch):
+    """
+    Record (user, event) pairs that were made elsewhere, e.g. queued by an
+    offline terminal. Events carry their shift id, so applying one twice
+    changes nothing, and one arriving after the user has moved on to
+    another shift leaves that shift open. Returns once they are durable.
+    """
+    backend = _backend()
+    if backend:
+        backend.apply_clock_events(batch)
+        publish_changes([_clock_change(user, event) for user, event in batch])
+        return
+    flush_writes()  # keep them behind anything already queued
+    _commit_clock_events(batch, late=True)
+
+def _record_clock_event(user, event):
+    if _write_queue:
+        _write_queue.put((user, event))
+    else:
+        _commit_clock_events([(user, event)])
+
+def _commit_clock_events(batch, late=False):
+    """
+    Write a batch of (user, event): one append per journal, one open-shift
+    index write, all under the store lock. late: the events may have been
+    made a while ago, check for clock-ins of shifts closed since.
+    """
+    journals = {}
+    for user, event in batch:
+        journals.setdefault((user["company"], user["id"]), (user, []))[1].append(event)
+    with _store_lock():
+        closed = _closed_shift_ids(batch) if late else ()
+        for user, events in journals.values():
+            if not _is_legacy_log(user):
+                os.makedirs(get_employee_log_dir(user), exist_ok=True)
+            _append_journal(get_employee_journal_path(user), *events)
+
+        index = _read_open_shifts()
+        changes = []
+        for user, event in batch:
+            changes.append(_clock_change(user, event, index.get(user["id"])))
+            _apply_open_event(index, user, event, closed)
+        _save_open_shifts(index)
+        publish_changes(changes)
+
+        for user, _ in journals.values():
+            _maybe_compact(user)
+
+
+# === SHIFT EDIT REQUESTS === #
+# Every request lives in one store (REQUESTS_FILE, or the requests table
+# under SQLite) with an index by status and company, so the Handle Requests
+# page can load just the pending ones and submitting is a single append.
+# Requests are identified by a stable "id"; updating or deleting one touches
+# only that request.
+
+_request_store = None
+
+def _get_request_store():
+    global _request_store
+    if _request_store is None or _request_store.path != REQUESTS_FILE:
+        _request_store = RequestStore(REQUESTS_FILE, _store_lock())
+    if not _request_store.exists() or _request_store.missing_ids():
+        with _store_lock():
+            # checked again: another process may have done it while we waited
+            if not _request_store.exists():
+                _import_legacy_requests(_request_store)
+            if _request_store.missing_ids():
+                _request_store.rewrite(_with_ids(_request_store.load()))
+    return _request_store
+
+def _with_ids(requests):
+    return [{**req, "id": uuid.uuid4().hex} if req["id"].startswith("legacy-") else req
+            for req in requests]
+
+def _import_legacy_requests(store):
+    """
+    Fill a store that doesn't exist yet from the old per-employee files,
+    then rename those to *.imported so they are never read again. Returns
+    how many requests were imported.
+    """
+    legacy, paths = _read_legacy_requests()
+    if legacy:
+        store.rewrite(legacy)
+    for path in paths:
+        os.replace(path, path + ".imported")
+    return len(legacy)
+
+def _read_legacy_requests():
+    """Requests from the old per-employee {company}/{id}_requests.json files, and the files read."""
+    found, paths, seen = [], [], set()
+    # the admin view used to read "Requests", the employee app wrote "requests"
+    for folder in (REQUESTS_FOLDER, os.path.join(DATABASE_FOLDER, "Requests")):
+        if not os.path.isdir(folder) or os.path.realpath(folder) in seen:
+            continue
+        seen.add(os.path.realpath(folder))
+        for company in sorted(os.listdir(folder)):
+            company_path = os.path.join(folder, company)
+            if not os.path.isdir(company_path):
+                continue
+            for filename in sorted(os.listdir(company_path)):
+                if not filename.endswith("_requests.json"):
+                    continue
+                path = os.path.join(company_path, filename)
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        requests = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    continue
+                employee = filename[:-len("_requests.json")]
+                for req in requests:
+                    found.append({"id": uuid.uuid4().hex, "employee": employee, "company": company, **req})
+                paths.append(path)
+    return found, paths
+
+def migrate_requests():
+    """
+    Build REQUESTS_FILE from the old per-employee files; returns how many
+    were imported. Raises FileExistsError if the store already exists
+    (load_requests imports the old files by itself on first use), rather
+    than overwriting the requests filed and handled since.
+    """
+    with _store_lock():
+        if os.path.exists(REQUESTS_FILE):
+            raise FileExistsError(f"{REQUESTS_FILE} already exists, the old request files were imported into it")
+        return _import_legacy_requests(RequestStore(REQUESTS_FILE, _store_lock()))
+
+def load_requests(status=None, company=None) -> List[Dict[str,Any]]:
+    """Requests (oldest submission first), optionally only one status and/or company."""
+    backend = _backend()
+    if backend:
+        return backend.load_requests(status, company)
+    return _get_request_store().load(status, company)
+
+def new_request(user, data):
+    """A complete pending request from the request form's fields."""
+    return {
+        "id": uuid.uuid4().hex,
+        "employee": user["id"],
+        "company": user["company"],
+        "submitted_at": now_trimmed(),
+        "status": "pending",
+        **data
+    }
+
+def submit_request(user, data):
+    req = new_request(user, data)
+    _store_request(req)
+    return req
+
+def add_request(req):
+    """Store a request made elsewhere (e.g. queued offline); does nothing if its id is already stored."""
+    if get_request(req["id"]) is None:
+        _store_request(req)
+
+def _store_request(req):
+    backend = _backend()
+    if backend:
+        backend.submit_request(req)
+    else:
+        _get_request_store().append(req)
+    publish_changes([{"type": "request_created", "request": req}])
+
+def get_request(request_id):
+    backend = _backend()
+    if backend:
+        return backend.get_request(request_id)
+    return _get_request_store().get(request_id)
+
+def update_request(request_id, changes):
+    """Apply `changes` to one request; returns the updated request, or None if it is gone."""
+    backend = _backend()
+    if backend:
+        req = backend.update_request(request_id, changes)
+    else:
+        req = _get_request_store().update(request_id, changes)
+    if req is not None:
+        publish_changes([{"type": "request_changed", "request": req}])
+    return req
+
+def delete_request(request_id):
+    backend = _backend()
+    if backend:
+        deleted = backend.delete_request(request_id)
+    else:
+        deleted = _get_request_store().delete(request_id)
+    if deleted:
+        publish_changes([{"type": "request_deleted", "request": {"id": request_id}}])
+    return deleted
+
+
+# === CHANGE FEED === #
+# Every change to shifts or requests is published as one JSON object:
+#   {"type": "shift_opened" | "shift_closed" | "shift_created" |
+#            "shift_edited" | "shift_deleted", "user": {"id", "company"}, "shift": log}
+#   {"type": "request_created" | "request_changed" | "request_deleted", "request": req}
+# Readers follow it with read_changes(cursor) and apply just those deltas.
+# CHANGES_FILE starts with a header carrying a generation id and is started
+# over (new generation) once it outgrows CHANGE_FEED_MAX_BYTES; the cursor
+# is [generation, byte offset]. Under SQLite the feed is the changes table.
+
+CHANGE_FEED_MAX_BYTES = 4 * 1024 * 1024
+
+def _shift_change(kind, user, log):
+    return {"type": kind, "user": {"id": user["id"], "company": user["company"]}, "shift": dict(log)}
+
+def _clock_change(user, event, open_shift=None):
+    """Change for a journal clock event; open_shift (index record) fills in a clock-out."""
+    log = {k: v for k, v in event.items() if k != "event"}
+    if event["event"] == "clock_in":
+        return _shift_change("shift_opened", user, log)
+    if open_shift and open_shift.get("id") == event.get("id"):
+        log = {**{k: v for k, v in open_shift.items() if k != "company"}, **log}
+    return _shift_change("shift_closed", user, log)
+
+def _shift_changes(user, old, new):
+    """Changes that turn the log list `old` into `new`."""
+    def key(log):
+        return log.get("id") or log.get("clock_in")
+    before = {key(log): log for log in old}
+    after = {key(log): log for log in new}
+    changes = [_shift_change("shift_deleted", user, log) for k, log in before.items() if k not in after]
+    for k, log in after.items():
+        prev = before.get(k)
+        if prev is None:
+            changes.append(_shift_change("shift_created", user, log))
+        elif prev != log:
+            closed = prev.get("clock_out") is None and log.get("clock_out") is not None
+            changes.append(_shift_change("shift_closed" if closed else "shift_edited", user, log))
+    return changes
+
+def change_key(change):
+    """Key of the shift or request a change is about; the same key as shift_key() for shifts."""
+    if "request" in change:
+        return change["request"]["id"]
+    log = change["shift"]
+    return (change["user"]["id"], log.get("id") or log.get("clock_in"))
+
+def shift_key(shift):
+    return (shift.user_id, shift.id or shift.clock_in)
+
+def shift_to_log(shift):
+    log = {"task": shift.task, "location": shift.location,
+           "clock_in": shift.clock_in, "clock_out": shift.clock_out}
+    return {"id": shift.id, **log} if shift.id else log
+
+def change_to_shift(change):
+    """Shift record for a shift change."""
+    log, user = change["shift"], change["user"]
+    end = log.get("clock_out")
+    return Shift(user["id"], user["company"], log.get("task"), log.get("location"),
+                 log["clock_in"], end, iso_to_minutes(log["clock_in"]),
+                 iso_to_minutes(end) if end else None, log.get("id"))
+
+def publish_changes(changes):
+    if not changes or SERVICE_ADDRESS:
+        return  # a clock service publishes its own changes
+    backend = _backend()
+    if backend:
+        return backend.publish_changes(changes)
+    data = "".join(json.dumps(change, ensure_ascii=False) + "\n" for change in changes)
+    # under the store lock, so appends from several terminals don't
+    # interleave and a rotation can't drop another writer's changes
+    with _store_lock():
+        try:
+            size = os.path.getsize(CHANGES_FILE)
+        except FileNotFoundError:
+            size = None
+        if size is None or size > CHANGE_FEED_MAX_BYTES:
+            header = json.dumps({"feed": "changes", "generation": uuid.uuid4().hex}) + "\n"
+            os.makedirs(DATABASE_FOLDER, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=DATABASE_FOLDER, prefix="changes.jsonl.", suffix=".tmp")
+            with open(fd, "w", encoding="utf-8") as f:
+                f.write(header + data)
+            os.replace(tmp, CHANGES_FILE)
+        else:
+            with open(CHANGES_FILE, "a", encoding="utf-8") as f:
+                f.write(data)
+
+def read_changes(cursor=None):
+    """
+    Changes published after `cursor`, as (changes, new cursor). With
+    cursor=None there are no changes, just the cursor for "now" -- take it
+    before loading the full state. changes is None when the feed was
+    started over since `cursor`, or didn't exist yet when the cursor was
+    taken (its generation is unknown, so it can't be trusted to hold
+    everything since); reload everything then.
+    """
+    backend = _backend()
+    if backend:
+        return backend.read_changes(cursor)
+    try:
+        f = open(CHANGES_FILE, "rb")
+    except FileNotFoundError:
+        return ([] if cursor is None or cursor[0] is None else None), [None, 0]
+    with f:
+        header = f.readline()
+        try:
+            generation = json.loads(header)["generation"]
+        except (json.JSONDecodeError, KeyError):
+            generation = None
+        end = os.fstat(f.fileno()).st_size
+        if cursor is None:
+            return [], [generation, end]
+        if cursor[0] != generation or cursor[1] > end:
+            return None, [generation, end]
+        offset = cursor[1]
+        f.seek(offset)
+        changes = []
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # still being written
+            offset += len(line)
+            changes.append(json.loads(line))
+    return changes, [generation, offset]
+
+
 # === TIME FORMATTING & CALCULATION === #
+# Shift times are handled as integer minutes since 1970-01-01 (local wall
+# clock, no timezone), so filtering and totalling is integer arithmetic.
+
+EPOCH = datetime(1970, 1, 1)
+_MINUTE = timedelta(minutes=1)
+
+@lru_cache(maxsize=65536)
+def iso_to_minutes(iso):
+    return (datetime.fromisoformat(iso) - EPOCH) // _MINUTE
+
+def minutes_to_datetime(minutes):
+    return EPOCH + timedelta(minutes=minutes)
+
+def date_to_minutes(day):
+    return (day - EPOCH.date()).days * 1440
+
+def now_minutes():
+    return iso_to_minutes(now_trimmed())
 
 def now_trimmed():
     return datetime.now().replace(second=0, microsecond=0).isoformat()
@@ -155,14 +1253,15 @@ def format_time(iso):
     dt = datetime.fromisoformat(iso)
     return dt.strftime("%b %d, %H:%M")
 
-def format_duration(start_iso, end_iso, ongoing=False):
-    start_dt = datetime.fromisoformat(start_iso)
-    end_dt   = datetime.fromisoformat(end_iso)
-    delta    = end_dt - start_dt
-    mins = int(delta.total_seconds() // 60)
-    h, m = divmod(mins, 60)
+def format_duration_minutes(start, end, ongoing=False):
+    h, m = divmod(end - start, 60)
     verb = "Working" if ongoing else "Worked"
+    start_dt = minutes_to_datetime(start)
+    end_dt   = minutes_to_datetime(end)
     return f"{verb} {h} hours and {m} minutes (from {start_dt:%H:%M} to {end_dt:%H:%M})"
 
+def format_duration(start_iso, end_iso, ongoing=False):
+    return format_duration_minutes(iso_to_minutes(start_iso), iso_to_minutes(end_iso), ongoing)
+
 def calc_duration(start, end):
-    return str(datetime.fromisoformat(end) - datetime.fromisoformat(start))
+    return str(timedelta(minutes=iso_to_minutes(end) - iso_to_minutes(start)))
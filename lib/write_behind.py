@@ -0,0 +1,71 @@
+import threading
+import time
+import traceback
+from typing import Any, Callable, List
+
+
+class WriteBehindQueue:
+    """
+    Collects items from put() and hands them to `commit` in batches from a
+    background thread. The first item of a batch starts a `window`-second
+    wait, so a burst of punches arriving within the window is written with
+    one commit. flush() commits whatever is queued right away.
+
+    Items stay visible through pending() until their commit has finished,
+    so callers can overlay them on what is already on disk.
+    """
+
+    def __init__(self, commit: Callable[[List[Any]], None], window: float = 0.2):
+        self._commit = commit
+        self.window = window
+        self._cond = threading.Condition()
+        self._queued: List[Any] = []
+        self._in_flight: List[Any] = []
+        self._commit_lock = threading.Lock()
+        self._committer = None  # thread running commit, if any
+        self._thread = None
+
+    def put(self, item):
+        with self._cond:
+            self._queued.append(item)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def pending(self) -> List[Any]:
+        """Items put but not yet committed, oldest first."""
+        with self._cond:
+            return self._in_flight + self._queued
+
+    def flush(self):
+        if self._committer == threading.get_ident():
+            return  # reached again from inside commit; this batch is already on its way
+        with self._commit_lock:
+            with self._cond:
+                batch, self._queued = self._queued, []
+                self._in_flight = self._in_flight + batch
+            if not batch:
+                return
+            self._committer = threading.get_ident()
+            try:
+                self._commit(batch)
+            except BaseException:
+                with self._cond:
+                    self._queued[:0] = batch  # keep them for the next attempt
+                raise
+            finally:
+                self._committer = None
+                with self._cond:
+                    self._in_flight = self._in_flight[len(batch):]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queued:
+                    self._cond.wait()
+            time.sleep(self.window)
+            try:
+                self.flush()
+            except Exception:
+                traceback.print_exc()
@@ -0,0 +1,5 @@
+@echo off
+cd /d "%~dp0"
+echo clock service running, set SHIFT_SERVICE to its address (and SHIFT_SERVICE_TOKEN) on the terminals...
+python -m apps.clock_service %*
+pause >nul
@@ -8,7 +8,7 @@ setup(
     packages=find_packages(include=['lib', 'shared', 'apps', 'lib.*', 'shared.*', 'apps.*']),
     install_requires=[
         "Pillow>=10.0.0",
-        "openpyxl>=3.1.2",
+        "openpyxl>=3.1.2,<3.2",
         "tktimepicker @ git+https://github.com/noklam/tktimepicker.git",
         "appdirs>=1.4.4",
         "tk",  # Tkinter (note: for some environments, this is included with Python)
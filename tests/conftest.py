@@ -0,0 +1,32 @@
+"""
+Each test that asks for `database` gets an empty Database folder and
+outbox under tmp_path. lib.utils reads the SHIFT_* variables at import,
+so they are set first and the module is reloaded.
+"""
+import importlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib import utils
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """lib.utils on a fresh JSON Database folder."""
+    monkeypatch.setenv("SHIFT_DATABASE", str(tmp_path / "Database"))
+    monkeypatch.setenv("SHIFT_OUTBOX", str(tmp_path / "Outbox"))
+    monkeypatch.setenv("SHIFT_STORAGE", "json")
+    monkeypatch.delenv("SHIFT_SERVICE", raising=False)
+    monkeypatch.delenv("SHIFT_SERVICE_TOKEN", raising=False)
+    importlib.reload(utils)
+    os.makedirs(utils.DATABASE_FOLDER)
+    yield utils
+    utils.flush_writes()
+    sqlite_backend = sys.modules.get("lib.sqlite_backend")
+    if sqlite_backend and sqlite_backend._conn is not None:
+        sqlite_backend._conn.close()
+        sqlite_backend._conn = None
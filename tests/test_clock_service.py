@@ -0,0 +1,19 @@
+import pytest
+
+from apps import clock_service
+
+
+@pytest.mark.parametrize("message", [[], 1, "load_users", None, {"args": []}, {"call": ["load_users"]},
+                                     {"call": "load_users", "args": {"a": 1}}, {"call": "load_users", "args": 2}])
+def test_malformed_requests_are_refused(message):
+    assert clock_service.dispatch(message) == {"error": "malformed request"}
+
+
+def test_calls_are_dispatched(database):
+    database.save_users([{"id": "u1", "name": "Anna", "company": "Acme", "pin": "1111"}])
+
+    assert clock_service.dispatch({"call": "load_users"})["result"][0]["id"] == "u1"
+    assert clock_service.dispatch({"call": "get_request", "args": ["nope"]}) == {"result": None}
+    assert clock_service.dispatch({"call": "log_version", "args": [{"id": "u1", "company": "Acme"}]}) == \
+        {"result": database._log_version({"id": "u1", "company": "Acme"})}
+    assert clock_service.dispatch({"call": "no_such_call", "args": []}) == {"error": "unknown call 'no_such_call'"}
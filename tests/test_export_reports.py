@@ -0,0 +1,62 @@
+import importlib
+
+import pytest
+from openpyxl import load_workbook
+
+from lib.periods import month_period
+
+USERS = [
+    {"id": "u1", "name": "Anna", "company": "Acme", "pin": "1111"},
+    {"id": "u2", "name": "Bjarni", "company": "Acme", "pin": "2222"},
+]
+TASKS = {"Site 1": {"Acme": [{"name": "Painting", "completed": True},
+                             {"name": "Plumbing", "completed": False}]}}
+
+
+def shift(task, clock_in, clock_out):
+    return {"task": task, "location": "Site 1", "clock_in": clock_in, "clock_out": clock_out}
+
+
+@pytest.fixture
+def exporter(database):
+    from apps import export_company_reports
+    return importlib.reload(export_company_reports)  # EXPORT_FOLDER comes from lib.utils
+
+
+def test_company_report_reads_back(database, exporter):
+    database.save_users(USERS)
+    database.save_task_config(TASKS)
+    database.save_employee_logs(USERS[0], [
+        shift("Painting", "2025-07-01T08:00:00", "2025-07-01T12:00:00"),
+        shift("Plumbing", "2025-07-02T08:00:00", "2025-07-02T10:30:00"),
+    ])
+    database.save_employee_logs(USERS[1], [
+        shift("Painting", "2025-07-01T09:00:00", "2025-07-01T11:00:00"),
+    ])
+    period = month_period("2025-07")
+
+    exporter.export_company_to_excel("Acme", period)
+
+    ws = load_workbook(exporter.get_report_path("Acme", period))["Work Hours"]
+    rows = [[cell.value for cell in row] for row in ws.iter_rows()]
+    assert rows[0][0] == "1st of July"
+    assert rows[1] == exporter.HEADERS
+    assert rows[2] == ["u1", "Anna", "Site 1", "Painting", "08:00", "12:00", 4.0]
+    assert rows[3] == ["u2", "Bjarni", "Site 1", "Painting", "09:00", "11:00", 2.0]
+    assert rows[4][6] == "Total: 6.0 hrs"
+    assert rows[7][0] == "2nd of July"
+    assert rows[9] == ["u1", "Anna", "Site 1", "Plumbing", "08:00", "10:30", 2.5]
+    assert rows[12][6] == "Overall Total Hours: 8.5 hrs"
+    assert rows[14][0] == "Task Summary"
+    assert rows[15][:3] == exporter.TASK_HEADERS
+    assert rows[16][:3] == ["Painting", 6, "Yes"]
+    assert rows[17][:3] == ["Plumbing", 2.5, "No"]
+
+    # the named styles and layout made it into the file
+    assert ws["A1"].style == "Report section"
+    assert ws["A2"].style == "Report header" and ws["A2"].font.bold
+    assert ws["A3"].style == "Report cell" and ws["A3"].border.left.style == "thin"
+    assert ws["G5"].style == "Report total" and ws["G5"].font.bold
+    assert "A1:G1" in {str(r) for r in ws.merged_cells.ranges}
+    assert "A15:C15" in {str(r) for r in ws.merged_cells.ranges}
+    assert ws.column_dimensions["B"].width == len("Total Hours") + 2
@@ -0,0 +1,128 @@
+import importlib
+import json
+import os
+
+import pytest
+
+from lib.service_client import ServiceError, ServiceUnavailable
+
+ANNA = {"id": "u1", "name": "Anna", "company": "Acme", "pin": "1111"}
+BJARNI = {"id": "u2", "name": "Bjarni", "company": "Acme", "pin": "2222"}
+
+
+@pytest.fixture
+def outbox(database):
+    from lib import outbox
+    return importlib.reload(outbox)  # LOCAL_FOLDER comes from SHIFT_OUTBOX
+
+
+@pytest.fixture
+def offline(database):
+    """Call to take the Database folder away (drive unmapped), and again to bring it back."""
+    away = database.DATABASE_FOLDER + ".away"
+    def toggle():
+        if os.path.exists(away):
+            os.rename(away, database.DATABASE_FOLDER)
+        else:
+            os.rename(database.DATABASE_FOLDER, away)
+    return toggle
+
+
+def test_punches_made_offline_are_replayed(database, outbox, offline):
+    database.save_users([ANNA, BJARNI])
+    assert outbox.get_user_by_pin("1111")["id"] == ANNA["id"]  # cached for later
+    offline()
+
+    assert outbox.get_user_by_pin("1111")["id"] == ANNA["id"]
+    first = outbox.clock_in_user(ANNA, "Painting", "Site 1")
+    assert outbox.is_clocked_in(ANNA)
+    closed = outbox.clock_out_user(ANNA)
+    second = outbox.clock_in_user(BJARNI, "Plumbing", "Site 1")
+    req = outbox.submit_request(ANNA, {"task": "Painting", "location": "Site 1", "reason": "Forgot"})
+    assert len(outbox._outbox.pending()) == 4
+    assert not outbox.is_clocked_in(ANNA) and outbox.is_clocked_in(BJARNI)
+    with pytest.raises(FileNotFoundError):
+        outbox.sync()
+
+    offline()
+    assert outbox.sync() == 4
+
+    assert outbox._outbox.pending() == []
+    assert not os.path.exists(outbox._outbox.path)
+    assert database.load_employee_logs(ANNA) == [closed]
+    assert [log["id"] for log in database.load_employee_logs(BJARNI)] == [second["id"]]
+    assert closed["id"] == first["id"]
+    assert list(database.load_open_shifts()) == [BJARNI["id"]]
+    assert database.get_request(req["id"]) == req
+    assert outbox.sync() == 0
+
+
+def test_replaying_delivered_events_changes_nothing(database, outbox):
+    entry = outbox.clock_in_user(ANNA, "Painting", "Site 1")
+    closed = outbox.clock_out_user(ANNA)
+    delivered = [{"event_id": "again", "kind": "clock", "user": {"id": "u1", "company": "Acme"},
+                  "event": {"event": "clock_in", **entry}},
+                 {"event_id": "again2", "kind": "clock", "user": {"id": "u1", "company": "Acme"},
+                  "event": {"event": "clock_out", "id": entry["id"], "clock_in": entry["clock_in"],
+                            "clock_out": closed["clock_out"]}}]
+    for event in delivered:
+        outbox._outbox.append(event)
+
+    assert outbox.sync() == 2
+    assert database.load_employee_logs(ANNA) == [closed]
+    assert database.load_open_shifts() == {}
+
+
+def test_refused_events_are_set_aside(database, outbox):
+    outbox._outbox.append({"event_id": "bad", "kind": "request", "request": {"no": "id"}})
+    with open(outbox._outbox.path, "a", encoding="utf-8") as f:
+        f.write("{not json\n")
+    entry = outbox.clock_in_user(ANNA, "Painting", "Site 1")
+
+    assert outbox._outbox.pending() == []
+    assert list(database.load_open_shifts()) == [ANNA["id"]]
+    assert database.load_open_shifts()[ANNA["id"]]["id"] == entry["id"]
+    with open(outbox._outbox.rejected_path, encoding="utf-8") as f:
+        rejected = [json.loads(line) for line in f]
+    assert [r["event"].get("event_id") for r in rejected] == ["bad", None]
+    assert rejected[1]["event"]["line"] == "{not json"
+
+
+def test_unreachable_service_keeps_the_queue(database, outbox, monkeypatch):
+    def down(batch):
+        raise ServiceUnavailable("clock service at 127.0.0.1:8765 unavailable")
+    monkeypatch.setattr(database, "apply_clock_events", down)
+    outbox.clock_in_user(ANNA, "Painting", "Site 1")
+    assert len(outbox._outbox.pending()) == 1
+    assert not os.path.exists(outbox._outbox.rejected_path)
+
+    def refused(batch):
+        raise ServiceError("ValueError: bad event")
+    monkeypatch.setattr(database, "apply_clock_events", refused)
+    assert outbox.sync() == 1
+    assert outbox._outbox.pending() == []
+    assert os.path.exists(outbox._outbox.rejected_path)
+
+
+@pytest.mark.parametrize("storage", ["json", "sqlite"])
+def test_late_delivery_leaves_the_new_shift_open(database, outbox, offline, monkeypatch, storage):
+    monkeypatch.setattr(database, "STORAGE_BACKEND", storage)
+    offline()
+    first = outbox.clock_in_user(ANNA, "Painting", "Site 1")
+    outbox.clock_out_user(ANNA)
+    offline()
+    # meanwhile Anna clocks in on a terminal that is online
+    second = database.clock_in_user(ANNA, "Plumbing", "Site 1")
+
+    assert outbox.sync() == 2
+    assert database.is_clocked_in(ANNA)
+    assert database.load_open_shifts()[ANNA["id"]]["id"] == second["id"]
+    logs = {log["id"]: log for log in database.load_employee_logs(ANNA)}
+    assert logs[first["id"]]["clock_out"] is not None and logs[second["id"]]["clock_out"] is None
+
+    # the first clock-in delivered once more, after its shift closed
+    database.apply_clock_events([(ANNA, {"event": "clock_in", **first})])
+    assert database.load_open_shifts()[ANNA["id"]]["id"] == second["id"]
+    database.clock_out_user(ANNA)
+    database.apply_clock_events([(ANNA, {"event": "clock_in", **first})])
+    assert not database.is_clocked_in(ANNA)
@@ -0,0 +1,86 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# each terminal files requests, approves half and withdraws the rest,
+# compacting the store every few writes
+TERMINAL = """
+import sys
+from lib import request_store, utils
+request_store.COMPACT_STALE_LINES = 4
+user = {"id": sys.argv[1], "company": "Acme"}
+for i in range(int(sys.argv[2])):
+    kept = utils.submit_request(user, {"reason": f"kept {i}"})
+    withdrawn = utils.submit_request(user, {"reason": f"withdrawn {i}"})
+    utils.update_request(kept["id"], {"status": "approved"})
+    utils.delete_request(withdrawn["id"])
+"""
+
+
+def test_concurrent_writers_and_compaction_lose_nothing(database):
+    env = {**os.environ, "SHIFT_DATABASE": database.DATABASE_FOLDER, "SHIFT_STORAGE": "json"}
+    terminals = [subprocess.Popen([sys.executable, "-c", TERMINAL, f"t{n}", "40"], cwd=ROOT, env=env)
+                 for n in range(3)]
+    assert [t.wait(timeout=120) for t in terminals] == [0, 0, 0]
+
+    requests = database.load_requests()
+    assert sorted((r["employee"], r["reason"]) for r in requests) == \
+        sorted((f"t{n}", f"kept {i}") for n in range(3) for i in range(40))
+    assert {r["status"] for r in requests} == {"approved"}
+    assert not [name for name in os.listdir(database.REQUESTS_FOLDER) if name.endswith(".tmp")]
+
+
+def write_legacy_requests(database, company, employee, requests):
+    folder = os.path.join(database.REQUESTS_FOLDER, company)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{employee}_requests.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(requests, f)
+    return path
+
+
+def test_migration_never_overwrites_the_store(database):
+    path = write_legacy_requests(database, "Acme", "u1", [{"reason": "Forgot", "status": "pending"}])
+    [imported] = database.load_requests()  # imported on first use
+    assert not os.path.exists(path) and os.path.exists(path + ".imported")
+
+    filed = database.submit_request({"id": "u2", "company": "Acme"}, {"reason": "Late"})
+    database.update_request(imported["id"], {"status": "approved"})
+    with pytest.raises(FileExistsError):
+        database.migrate_requests()
+
+    requests = database.load_requests()
+    assert [(r["id"], r["status"]) for r in requests] == [(imported["id"], "approved"), (filed["id"], "pending")]
+    assert database.load_requests() == requests
+
+
+def test_migration_imports_the_old_files_once(database):
+    write_legacy_requests(database, "Acme", "u1", [{"reason": "Forgot"}, {"reason": "Sick"}])
+    write_legacy_requests(database, "Acme", "u2", [{"reason": "Late"}])
+
+    assert database.migrate_requests() == 3
+    assert sorted(r["reason"] for r in database.load_requests()) == ["Forgot", "Late", "Sick"]
+    os.remove(database.REQUESTS_FILE)
+    assert database.load_requests() == []  # the renamed files aren't read again
+
+
+def test_requests_without_ids_get_them_once(database):
+    # a store written before requests had ids
+    os.makedirs(database.REQUESTS_FOLDER)
+    with open(database.REQUESTS_FILE, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"store": "requests", "generation": "old"}) + "\n")
+        for reason in ("Forgot", "Sick", "Late"):
+            f.write(json.dumps({"employee": "u1", "company": "Acme", "reason": reason}) + "\n")
+    env = {**os.environ, "SHIFT_DATABASE": database.DATABASE_FOLDER, "SHIFT_STORAGE": "json"}
+    opener = "from lib import utils; print(' '.join(r['id'] for r in utils.load_requests()))"
+    terminals = [subprocess.Popen([sys.executable, "-c", opener], cwd=ROOT, env=env, stdout=subprocess.PIPE,
+                                  text=True) for _ in range(4)]
+    seen = {t.communicate(timeout=60)[0].strip() for t in terminals}
+
+    assert seen == {" ".join(r["id"] for r in database.load_requests())}
+    assert not any(rid.startswith("legacy-") for rid in seen.pop().split())
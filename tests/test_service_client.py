@@ -0,0 +1,68 @@
+import json
+import socket
+import threading
+
+import pytest
+
+from lib import service_client, utils
+
+
+class FakeService:
+    """
+    Accepts one connection per plan in turn; for each line read it either
+    replies ("reply") or doesn't ("drop"), and closes the connection once
+    its plan is done.
+    """
+    def __init__(self, *plans):
+        self.server = socket.create_server(("127.0.0.1", 0))
+        self.address = "127.0.0.1:%d" % self.server.getsockname()[1]
+        self.received = []
+        self.closed = threading.Semaphore(0)
+        self.thread = threading.Thread(target=self.serve, args=(plans,), daemon=True)
+        self.thread.start()
+
+    def serve(self, plans):
+        for plan in plans:
+            conn, _ = self.server.accept()
+            with conn, conn.makefile("rb") as lines:
+                for action in plan:
+                    line = lines.readline()
+                    if not line:
+                        break
+                    self.received.append(json.loads(line)["call"])
+                    if action == "reply":
+                        conn.sendall(service_client.encode({"result": len(self.received)}))
+            self.closed.release()
+        self.server.close()
+
+
+@pytest.fixture
+def service(monkeypatch):
+    def start(*plans):
+        fake = FakeService(*plans)
+        monkeypatch.setattr(utils, "SERVICE_ADDRESS", fake.address)
+        return fake
+    yield start
+    service_client._close()
+
+
+def test_written_call_is_not_sent_again(service):
+    fake = service(["drop"], ["reply"])
+
+    with pytest.raises(service_client.ServiceUnavailable):
+        service_client.call("clock_in_user", {"id": "u1"}, "Painting", "Site 1")
+
+    assert fake.closed.acquire(timeout=5)
+    assert fake.received == ["clock_in_user"]
+    assert service_client.call("load_users") == 2  # the next call connects again
+
+
+def test_restarted_service_gets_each_call_once(service):
+    fake = service(["reply"], ["reply"])
+
+    assert service_client.call("load_users") == 1
+    assert fake.closed.acquire(timeout=5)  # the service went away with the connection
+    assert service_client.call("submit_request", {"id": "r1"}) == 2
+
+    fake.thread.join(timeout=5)
+    assert fake.received == ["load_users", "submit_request"]
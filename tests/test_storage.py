@@ -0,0 +1,148 @@
+import json
+from datetime import date
+
+import pytest
+
+ANNA = {"id": "u1", "name": "Anna", "company": "Acme", "pin": "1111"}
+BJARNI = {"id": "u2", "name": "Bjarni", "company": "Acme", "pin": "2222"}
+
+
+def log(shift_id, task, clock_in, clock_out):
+    return {"id": shift_id, "task": task, "location": "Site 1", "clock_in": clock_in, "clock_out": clock_out}
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, database, monkeypatch):
+    """lib.utils on a fresh Database folder, once per storage backend."""
+    monkeypatch.setattr(database, "STORAGE_BACKEND", request.param)
+    return database
+
+
+def test_clock_in_and_out(store):
+    entry = store.clock_in_user(ANNA, "Painting", "Site 1")
+
+    assert store.is_clocked_in(ANNA)
+    assert not store.is_clocked_in(BJARNI)
+    assert store.load_open_shifts()[ANNA["id"]] == {"company": "Acme", **entry}
+
+    closed = store.clock_out_user(ANNA)
+
+    assert closed["id"] == entry["id"] and closed["clock_in"] == entry["clock_in"]
+    assert closed["clock_out"] is not None
+    assert not store.is_clocked_in(ANNA)
+    assert store.load_employee_logs(ANNA) == [closed]
+    assert store.clock_out_user(ANNA) is None
+
+
+def test_save_and_replace_shifts(store):
+    logs = [
+        log("a", "Painting", "2025-06-30T08:00:00", "2025-06-30T16:00:00"),
+        log("b", "Painting", "2025-07-01T08:00:00", "2025-07-01T12:00:00"),
+        log("c", "Plumbing", "2025-07-02T08:00:00", "2025-07-02T10:00:00"),
+    ]
+    store.save_employee_logs(ANNA, logs)
+    store.save_employee_logs(BJARNI, [log("d", "Painting", "2025-07-01T09:00:00", "2025-07-01T11:00:00")])
+
+    assert store.load_employee_logs(ANNA) == logs
+    assert [s.id for s in store.load_shifts(ANNA)] == ["a", "b", "c"]
+
+    # an approved edit request: shift b replaced by a longer one
+    old = [s for s in store.load_shifts(ANNA) if s.id == "b"]
+    new = log("e", "Painting", "2025-07-01T07:30:00", "2025-07-01T13:00:00")
+    store.replace_employee_shifts(ANNA, old, [new])
+
+    assert sorted(l["id"] for l in store.load_employee_logs(ANNA)) == ["a", "c", "e"]
+    assert store.get_shift_interval_index(ANNA).overlapping(
+        store.iso_to_minutes("2025-07-01T12:30:00"), store.iso_to_minutes("2025-07-01T12:45:00"))
+    assert [l["id"] for l in store.load_employee_logs(BJARNI)] == ["d"]
+
+    store.save_employee_logs(ANNA, [])
+    assert store.load_employee_logs(ANNA) == []
+
+
+def scenario(utils, request):
+    """The same writes through each backend; returns everything read back."""
+    utils.save_users([ANNA, BJARNI])
+    utils.save_employee_logs(ANNA, [log("a", "Painting", "2025-07-01T08:00:00", "2025-07-01T12:00:00"),
+                                    log("b", "Plumbing", "2025-07-02T08:00:00", "2025-07-02T10:00:00")])
+    utils.apply_clock_events([
+        (BJARNI, {"event": "clock_in", **log("c", "Painting", "2025-07-03T08:00:00", None)}),
+        (ANNA, {"event": "clock_in", **log("d", "Painting", "2025-07-03T08:15:00", None)}),
+        (BJARNI, {"event": "clock_out", "id": "c", "clock_in": "2025-07-03T08:00:00",
+                  "clock_out": "2025-07-03T15:00:00"}),
+    ])
+    utils.apply_clock_events([(BJARNI, {"event": "clock_out", "id": "c", "clock_in": "2025-07-03T08:00:00",
+                                         "clock_out": "2025-07-03T15:00:00"})])  # replayed
+    utils.replace_employee_shifts(ANNA, [s for s in utils.load_shifts(ANNA) if s.id == "b"],
+                                  [log("e", "Plumbing", "2025-07-02T08:00:00", "2025-07-02T11:00:00")])
+    utils.add_request(request)
+    utils.add_request(request)  # replayed
+    utils.update_request(request["id"], {"status": "approved"})
+    return {
+        "users": utils.load_users(),
+        "anna": sorted(utils.load_employee_logs(ANNA), key=lambda l: l["clock_in"]),
+        "bjarni": utils.load_employee_logs(BJARNI),
+        "open": utils.load_open_shifts(),
+        "july": sorted(utils.query_shifts("Acme", since=date(2025, 7, 1), until=date(2025, 7, 31))),
+        "companies": utils.list_companies(),
+        "employees": utils.list_employee_ids("Acme"),
+        "requests": utils.load_requests(),
+        "approved": utils.load_requests("approved", "Acme"),
+        "pending": utils.load_requests("pending"),
+    }
+
+
+def test_json_and_sqlite_agree(database, monkeypatch):
+    request = database.new_request(ANNA, {"task": "Plumbing", "location": "Site 1",
+                                          "requested_start": "2025-07-02 08:00:00",
+                                          "requested_end": "2025-07-02 12:00:00", "reason": "Forgot"})
+    json_results = scenario(database, request)
+    monkeypatch.setattr(database, "STORAGE_BACKEND", "sqlite")
+    sqlite_results = scenario(database, request)
+
+    assert sqlite_results == json_results
+    assert [l["id"] for l in json_results["anna"]] == ["a", "e", "d"]
+    assert list(json_results["open"]) == [ANNA["id"]]
+    assert len(json_results["requests"]) == 1 and json_results["approved"] == json_results["requests"]
+
+
+def test_interval_index_is_cached_until_the_shifts_change(store):
+    store.save_employee_logs(ANNA, [log("a", "Painting", "2025-07-01T08:00:00", "2025-07-01T12:00:00")])
+    index = store.get_shift_interval_index(ANNA)
+    assert store.get_shift_interval_index(ANNA) is index
+
+    def ids(start, end):
+        found = store.get_shift_interval_index(ANNA).overlapping(store.iso_to_minutes(start),
+                                                                 store.iso_to_minutes(end))
+        return sorted(shift.id for shift in found)
+
+    store.apply_clock_events([(ANNA, {"event": "clock_in", **log("b", "Painting", "2025-07-02T08:00:00", None)})])
+    assert ids("2025-07-02T09:00:00", "2025-07-02T10:00:00") == []  # still open
+    store.apply_clock_events([(ANNA, {"event": "clock_out", "id": "b", "clock_in": "2025-07-02T08:00:00",
+                                      "clock_out": "2025-07-02T16:00:00"})])
+    assert ids("2025-07-02T09:00:00", "2025-07-02T10:00:00") == ["b"]
+
+    old = [s for s in store.load_shifts(ANNA) if s.id == "a"]
+    store.replace_employee_shifts(ANNA, old, [log("c", "Painting", "2025-07-01T13:00:00", "2025-07-01T15:00:00")])
+    assert ids("2025-07-01T09:00:00", "2025-07-01T14:00:00") == ["c"]
+    assert store.get_shift_interval_index(ANNA) is store.get_shift_interval_index(ANNA)
+
+
+def test_snapshot_keeps_the_cache_of_untouched_users(database):
+    from lib import snapshot
+    database.save_employee_logs(BJARNI, [log("b", "Painting", "2025-07-01T09:00:00", "2025-07-01T11:00:00")])
+    database.save_employee_logs(ANNA, [log("a", "Painting", "2025-07-01T08:00:00", "2025-07-01T12:00:00")])
+    with open(database._partition_path(ANNA, "2025-07"), "w", encoding="utf-8") as f:
+        json.dump([log("a", "Painting", "2025-07-01T08:00:00", "2025-07-01T12:00:00")] * 2, f, indent=4)
+    bjarni_index = database.get_shift_interval_index(BJARNI)
+    bjarni_file = database._log_file_cache[database._partition_path(BJARNI, "2025-07")]
+    database.get_shift_interval_index(ANNA)
+
+    report = snapshot.run()
+
+    assert report["rewritten"] == 1 and "load_before" not in report
+    assert "full load" not in snapshot.format_report(report)
+    assert database.get_shift_interval_index(BJARNI) is bjarni_index
+    assert database._log_file_cache[database._partition_path(BJARNI, "2025-07")] is bjarni_file
+    assert (ANNA["company"], ANNA["id"]) not in database._interval_cache
+    assert [l["id"] for l in database.load_employee_logs(ANNA)] == ["a"]